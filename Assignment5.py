@@ -1,8 +1,10 @@
-import sqlite3 as sql
 import hashlib
+from LeopardWebPool import connect
+from LeopardWebSchema import migrate
+from LeopardWebSchedule import backfill_meeting_masks
 
-# Connect to the SQLite database
-database = sql.connect("LeopardWebDatabase.db")
+# Connect to the SQLite database using the WAL storage profile
+database = connect("LeopardWebDatabase.db")
 
 # Function to hash passwords
 def hash_password(password):
@@ -10,72 +12,14 @@ def hash_password(password):
 
 # Function to initialize the database
 def initialize_database():
-    # Drop tables if they exist to start fresh
-    database.execute("DROP TABLE IF EXISTS USER")
-    database.execute("DROP TABLE IF EXISTS STUDENT")
-    database.execute("DROP TABLE IF EXISTS INSTRUCTOR")
-    database.execute("DROP TABLE IF EXISTS ADMIN")
-    database.execute("DROP TABLE IF EXISTS COURSE")
-    database.execute("DROP TABLE IF EXISTS REGISTRATION")
-#Nadia completed this part
-    # Create tables
-    database.execute("""CREATE TABLE USER (
-        ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password TEXT NOT NULL,
-        role TEXT NOT NULL
-    );""")
-
-    database.execute("""CREATE TABLE STUDENT (
-        ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        NAME TEXT NOT NULL,
-        SURNAME TEXT NOT NULL,
-        USERNAME TEXT NOT NULL UNIQUE,
-        GRADYEAR TEXT,
-        MAJOR TEXT,
-        EMAIL TEXT,
-        FOREIGN KEY (USERNAME) REFERENCES USER(username)
-    );""")
-
-    database.execute("""CREATE TABLE INSTRUCTOR (
-        ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        NAME TEXT NOT NULL,
-        SURNAME TEXT NOT NULL,
-        TITLE TEXT,
-        HIREYEAR INTEGER,
-        DEPT TEXT,
-        EMAIL TEXT NOT NULL UNIQUE
-    );""")
-
-    database.execute("""CREATE TABLE ADMIN (
-        ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        NAME TEXT NOT NULL,
-        SURNAME TEXT NOT NULL,
-        TITLE TEXT,
-        OFFICE TEXT,
-        EMAIL TEXT NOT NULL UNIQUE
-    );""")
-
-    database.execute("""CREATE TABLE COURSE (
-        CRN INTEGER PRIMARY KEY,
-        TITLE TEXT NOT NULL,
-        DEPARTMENT TEXT NOT NULL,
-        TIME TEXT NOT NULL,
-        DAYS TEXT NOT NULL,
-        SEMESTER TEXT NOT NULL,
-        YEAR INTEGER NOT NULL,
-        CREDITS INTEGER NOT NULL,
-        instructor_id INTEGER,
-        FOREIGN KEY (instructor_id) REFERENCES INSTRUCTOR(ID)
-    );""")
-
-    database.execute("""CREATE TABLE REGISTRATION (
-        student_id INTEGER NOT NULL,
-        course_code INTEGER NOT NULL,
-        PRIMARY KEY (student_id, course_code),
-        FOREIGN KEY (student_id) REFERENCES USER(ID),
-        FOREIGN KEY (course_code) REFERENCES COURSE(CRN)
-    );""")
+    # Create or upgrade the schema in place; existing data is never dropped
+    migrate(database)
+
+    # Only seed the sample data into an empty database
+    if database.execute("SELECT 1 FROM USER LIMIT 1").fetchone():
+        print("Database already initialized, schema is up to date.")
+        return
+
 #Persia completed this part
     # Insert sample admins and instructors into USER table
     admin_password = hash_password("adminpass")
@@ -137,6 +81,7 @@ def initialize_database():
     database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor_id) VALUES (10010, 'Analog Circuit Design', 'Electronics', '9:30-11:00', 'TR', 'Fall', 2024, 4, 4)")
     database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor_id) VALUES (10011, 'Applied Programming Concepts', 'Electronics', '11:00-12:30', 'MW', 'Fall', 2024, 4, 4)")
     database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor_id) VALUES (10012, 'Computer Networks for Engineers', 'Electronics', '1:00-2:30', 'TR', 'Fall', 2024, 4, 4)")
+    backfill_meeting_masks(database)
 
     # Commit the transactions
     database.commit()
@@ -151,9 +96,14 @@ def clear_dynamic_data():
     database.execute("DELETE FROM ADMIN WHERE EMAIL NOT IN ('hamiltonm', 'rubinv');")
     database.execute("DELETE FROM COURSE WHERE CRN NOT IN (33173, 33184, 33171, 33172, 33182, 10001, 10002, 10003, 10004, 10005, 10006, 10007, 10008, 10009, 10010, 10011, 10012);")
     database.execute("DELETE FROM REGISTRATION;")
+    database.execute("DELETE FROM WAITLIST;")  # Queues may name removed users and courses
+    database.execute("UPDATE COURSE SET ENROLLED = 0;")  # Every seat is free again once the registrations are gone
     database.commit()
     print("Dynamic data cleared, base data kept intact.")
 
+# Bring an existing database up to the latest schema version
+migrate(database)
+
 # Ask user if they want to clear dynamic data or continue with the existing data
 choice = input("Do you want to (1) Clear dynamic data or (2) Continue with existing data? Enter 1 or 2: ")
 if choice == '1':
@@ -1,26 +1,81 @@
 import sqlite3 as sql  # Import the sqlite3 library and alias it as sql
-import hashlib  # Import the hashlib library for hashing passwords
+from LeopardWebPasswords import PasswordHasher  # Import the salted password hashing shared with the GUI
+from LeopardWebPool import connect  # Import the helper that applies the storage profile
+from LeopardWebSchema import migrate  # Import the schema migrations
+from LeopardWebSchedule import decode_mask, encode_mask, meeting_mask, split_schedule  # Import the meeting-time helpers
+from LeopardWebSearch import find_courses  # Import the full-text course search
+from LeopardWebSeats import conflicting_course, release_seat, reserve_or_wait  # Import the seat-taking registration writes shared with the GUI
 
-# Connect to the SQLite database
-database = sql.connect("LeopardWebDatabase.db")
+# Connect to the SQLite database using the WAL storage profile
+database = connect("LeopardWebDatabase.db")
+migrate(database)  # Make sure the course search index exists
 
 #Nadia completed this part
+# Salted scrypt password hashing, the same format the GUI stores
+hasher = PasswordHasher()
+
 # Function to hash passwords
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()  # Hash the password using SHA-256
+    return hasher.hash(password)  # Hash the password with a fresh salt
+
+# Function to look up the USER.ID of a username, or None if there is no such user
+def find_user_id(username):
+    row = database.execute("SELECT ID FROM USER WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else None
+
+# Function to register a student for a course, or put them on its waitlist when it
+# is full, keeping COURSE.ENROLLED in step in the same transaction. A course that
+# meets at the same time as one already on the student's schedule for that term
+# is refused with the same messages the GUI gives.
+def register_student(username, course_code):
+    student_id = find_user_id(username)
+    if student_id is None:
+        return "Student does not exist."
+    course = database.execute("SELECT SEMESTER, YEAR, MEETING_MASK FROM COURSE WHERE CRN = ?", (course_code,)).fetchone()
+    if course is None:
+        return "Invalid course code."
+    conflict = conflicting_course(database, student_id, course[0], course[1], decode_mask(course[2]))
+    if conflict == course_code:
+        return "You are already registered for this course."
+    if conflict is not None:
+        return f"Time conflict with course {conflict} on your schedule."
+    try:
+        status, position = reserve_or_wait(database, student_id, course_code)
+        database.commit()  # Commit the seat and the registration together
+    except sql.IntegrityError:
+        database.rollback()  # Undo the seat taken for a duplicate registration
+        return "You are already registered for this course."
+    if status == "invalid":
+        return "Invalid course code."
+    if status == "full":
+        if position is None:
+            return "Course is full. Already registered or on the waitlist for this course."
+        return f"Course is full. Number {position} on the waitlist."
+    return "added"
+
+# Function to drop a student from a course, giving the seat to the head of its waitlist
+def drop_student(username, course_code):
+    release_seat(database, find_user_id(username), course_code)
+    database.commit()  # Commit the drop, the freed seat and any promotion together
 
 #Nadia completed this part
 # Define the User class
 class User:
     def __init__(self, username, password, role):
         self.username = username  # Set the username
-        self.password = hash_password(password)  # Hash the password and set it
+        self.password = password  # Keep the password as entered; it is checked against the stored hash
         self.role = role  # Set the role of the user
 
     # Method to authenticate the user
     def authenticate(self):
-        cursor = database.execute("SELECT * FROM USER WHERE username = ? AND password = ?", (self.username, self.password))
-        return cursor.fetchone() is not None  # Return True if the user is found, otherwise False
+        row = database.execute("SELECT ID, password FROM USER WHERE username = ?", (self.username,)).fetchone()
+        if not hasher.verify(self.password, row[1] if row else None):
+            return False  # No such user or wrong password
+        if hasher.needs_rehash(row[1]):
+            # Replace a legacy SHA-256 hash, or one made with older settings, with a current one
+            database.execute("UPDATE USER SET password = ? WHERE ID = ? AND password = ?", (hash_password(self.password), row[0], row[1]))
+            database.commit()
+        return True
 
     # Method to print user information
     def print_info(self):
@@ -62,10 +117,12 @@ class Student(User):
         course = cursor.fetchone()
 
         if course:
-            self.schedule.append(Course(course[0], course[1], course[8], course[3]))  # Add the course to the schedule
-            database.execute("INSERT INTO REGISTRATION (student_id, course_code) VALUES ((SELECT ID FROM USER WHERE username = ?), ?)", (self.username, course_code))
-            database.commit()  # Commit the transaction
-            print("Course added to schedule and database updated.")
+            status = register_student(self.username, course_code)
+            if status == "added":
+                self.schedule.append(Course(course[0], course[1], course[8], course[3]))  # Add the course to the schedule
+                print("Course added to schedule and database updated.")
+            else:
+                print(status)
         else:
             print("Invalid course code.")
 
@@ -95,8 +152,7 @@ class Student(User):
         elif action == "drop":
             course_code = int(input("Enter the course code to drop: "))
             self.schedule = [course for course in self.schedule if course.course_code != course_code]
-            database.execute("DELETE FROM REGISTRATION WHERE student_id = (SELECT ID FROM USER WHERE username = ?) AND course_code = ?", (self.username, course_code))
-            database.commit()  # Commit the transaction
+            drop_student(self.username, course_code)
             print("Course dropped from schedule.")
         else:
             print("Invalid action.")
@@ -106,17 +162,25 @@ class Instructor(User):
     def __init__(self, username, password, role='instructor'):
         super().__init__(username, password, role)  # Initialize the User class
         self.courses_taught = {}  # Initialize the courses taught by the instructor as an empty dictionary
+        self.instructor_id = None  # INSTRUCTOR.ID, looked up the first time it is needed
 
     # Method to assign a course to the instructor
     def assign_course(self, course):
         self.courses_taught[course.course_name] = course
 
+    # Method to find the instructor's INSTRUCTOR.ID from their username (stored in EMAIL), cached per session
+    def resolve_instructor_id(self):
+        if self.instructor_id is None:
+            row = database.execute("SELECT ID FROM INSTRUCTOR WHERE EMAIL = ?", (self.username,)).fetchone()
+            self.instructor_id = row[0] if row else None
+        return self.instructor_id
+
     # Method for instructor to view their schedule
     def view_schedule(self):
         print("Viewing schedule...")
-        cursor = database.execute("SELECT * FROM COURSE WHERE instructor = ?", (self.username,))
+        cursor = database.execute("SELECT CRN, TITLE, TIME FROM COURSE WHERE instructor_id = ?", (self.resolve_instructor_id(),))  # Uses idx_course_instructor
         for row in cursor:
-            course = Course(row[0], row[1], row[2], row[3])
+            course = Course(row[0], row[1], self.username, row[2])
             self.courses_taught[course.course_name] = course  # Add the course to the courses taught by the instructor
             course.print_info()
 
@@ -147,8 +211,9 @@ class Admin(User):
         year = int(input("Enter year: "))
         credits = int(input("Enter credits: "))
         
-        database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", 
-                         (course_code, course_name, department, schedule, 'N/A', semester, year, credits, instructor))
+        days, time = split_schedule(schedule)  # Split 'MWF 8:00-8:50' into days and time so conflicts can be checked
+        database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor_id, MEETING_MASK) VALUES (?, ?, ?, ?, ?, ?, ?, ?, (SELECT ID FROM INSTRUCTOR WHERE EMAIL = ?), ?)", 
+                         (course_code, course_name, department, time, days, semester, year, credits, instructor, encode_mask(meeting_mask(days, time))))
         database.commit()  # Commit the transaction
         print("Course added to system.")
 
@@ -202,6 +267,11 @@ class Admin(User):
     # Method for admin to remove a user
     def remove_user(self):
         username = input("Enter username to remove: ")
+        user_id = find_user_id(username)
+        # Give back the seats held by the user, promoting waitlisted students into them
+        database.execute("DELETE FROM WAITLIST WHERE student_id = ?", (user_id,))
+        for (course_code,) in database.execute("SELECT course_code FROM REGISTRATION WHERE student_id = ?", (user_id,)).fetchall():
+            release_seat(database, user_id, course_code)
         database.execute("DELETE FROM USER WHERE username = ?", (username,))
         database.commit()  # Commit the transaction
         print("User removed successfully.")
@@ -210,18 +280,14 @@ class Admin(User):
     def add_student_to_course(self):
         student_username = input("Enter student username: ")
         course_code = int(input("Enter course code: "))
-        database.execute("INSERT INTO REGISTRATION (student_id, course_code) VALUES ((SELECT ID FROM USER WHERE username = ?), ?)", 
-                         (student_username, course_code))
-        database.commit()  # Commit the transaction
-        print("Student added to course.")
+        status = register_student(student_username, course_code)
+        print("Student added to course." if status == "added" else status)
 
     # Method for admin to remove a student from a course
     def remove_student_from_course(self):
         student_username = input("Enter student username: ")
         course_code = int(input("Enter course code: "))
-        database.execute("DELETE FROM REGISTRATION WHERE student_id = (SELECT ID FROM USER WHERE username = ?) AND course_code = ?", 
-                         (student_username, course_code))
-        database.commit()  # Commit the transaction
+        drop_student(student_username, course_code)
         print("Student removed from course.")
 
     # Method for admin to view all courses
@@ -391,9 +457,12 @@ def admin_menu(user):
 def search_courses():
     parameter = input("Enter search parameter (course code, name, instructor, schedule): ").lower()
     value = input("Enter value to search: ")
-    query = f"SELECT * FROM COURSE WHERE {parameter} LIKE ?"
-    cursor = database.execute(query, ('%' + value + '%',))
-    for row in cursor:
+    try:
+        rows = find_courses(database, parameter, value)  # Ranked search over the full-text index
+    except ValueError as error:
+        print(error)  # The parameter is not one of the searchable fields
+        return
+    for row in rows:
         print(f"Course Code: {row[0]}, Course Name: {row[1]}, Instructor: {row[2]}, Schedule: {row[3]}")
 
 # Start the application
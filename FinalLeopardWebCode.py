@@ -1,129 +1,494 @@
 import sqlite3 as sql
-import hashlib
+import functools
+import json
+import threading
+from collections import namedtuple
 import tkinter as tk
 from tkinter import messagebox, simpledialog
-
-# Connect to the SQLite database
-database = sql.connect("LeopardWebDatabase.db")
-
-# Function to hash passwords
+from LeopardWebPool import ConnectionPool
+from LeopardWebCatalog import CourseCatalog
+from LeopardWebListing import CourseListing, RosterListing
+from LeopardWebPasswords import PasswordHasher
+from LeopardWebSessions import SessionStore
+from LeopardWebSchema import migrate
+from LeopardWebSchedule import decode_mask, encode_mask, meeting_mask, split_schedule
+from LeopardWebSearch import RESULT_LIMIT, find_courses
+from LeopardWebSeats import conflicting_course, release_seat, reserve_cart, reserve_or_wait, reserve_seat
+from LeopardWebTasks import BackgroundTasks
+from LeopardWebVirtualList import VirtualList
+from LeopardWebUsers import UserDirectory
+from LeopardWebWriter import GroupCommitWriter, WriteAborted
+
+# Pool of connections to the SQLite database, checked out per thread
+pool = ConnectionPool("LeopardWebDatabase.db")
+
+# Formatted course listing shared by every session, kept current by the admin methods
+catalog = CourseCatalog()
+
+# Username -> USER.ID for the users the admin methods act on
+user_ids = UserDirectory()
+
+# Password hashing settings; new hashes use them and older ones are upgraded at login
+hasher = PasswordHasher()
+
+# Logged-in sessions, looked up by the token authenticate() hands out
+sessions = SessionStore()
+
+# Role -> query for the profile a session keeps, by username
+PROFILE_QUERIES = {
+    "student": "SELECT ID, NAME, SURNAME FROM STUDENT WHERE USERNAME = ?",
+    "instructor": "SELECT ID, NAME, SURNAME FROM INSTRUCTOR WHERE EMAIL = ?",
+    "admin": "SELECT ID, NAME, SURNAME FROM ADMIN WHERE EMAIL = ?",
+}
+
+# Group-commit writer that write() hands operations to while it is running
+writer = None
+
+# Number of rows per page returned by the *_page methods
+PAGE_SIZE = 50
+
+# Number of rows the iter_* methods fetch from a cursor at a time
+FETCH_SIZE = 500
+
+# Decorator that retries a write with backoff while another connection holds the lock
+def retry_when_busy(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        return pool.run(method, *args, **kwargs)
+    return wrapper
+
+# Decorator that runs a Student method under that student's lock. The background
+# tasks run on more than one worker, so without it one call could drop the cached
+# masks or clear the schedule while another is checking or appending to them.
+def holds_schedule_lock(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.schedule_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# Function to hash passwords on the hashing workers
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return hasher.hash_in_pool(password)
+
+# Function to run a write operation, a function that takes the database and does
+# not commit. On its own it gets a transaction and commit of its own; while group
+# commit is running it shares one with the other writes queued at the same time.
+# Either way the caller gets the operation's result, or its exception with
+# nothing it wrote kept.
+def write(operation, *args):
+    if writer is not None:
+        return writer.run(operation, *args)
+    with pool.connection() as database:
+        try:
+            result = operation(database, *args)
+        except Exception:
+            database.rollback()
+            raise
+        database.commit()
+        return result
+
+# Function to start coalescing the writes of every thread into group commits
+def start_group_commit(window=0.0):
+    global writer
+    stop_group_commit()
+    writer = GroupCommitWriter(pool.path, pool.profile, window)
+    return writer
+
+# Function to finish the queued writes and go back to one commit per write
+def stop_group_commit():
+    global writer
+    if writer is not None:
+        writer.close()
+        writer = None
+
+# Function to stream the rows of a query in fetchmany batches, so at most
+# FETCH_SIZE rows are in memory at once. The stream checks out a connection of
+# its own rather than the thread's pool.connection(): its read transaction stays
+# open while the generator is suspended, so sharing it would hold other work on
+# the thread in that transaction, and a generator finished on another thread
+# would clear that thread's slot. The connection goes back to the pool when the
+# generator is exhausted or closed.
+def stream_rows(query, parameters=()):
+    database = pool.acquire()
+    try:
+        cursor = database.execute(query, parameters)
+        try:
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+    finally:
+        pool.release(database)
+
+# Function to stream (course code, student name) for every student in a set of
+# courses with one query. The CRNs travel as a single JSON parameter, so any
+# number of courses costs one statement and one roster index seek per course.
+def iter_rosters(course_codes):
+    rows = stream_rows("""
+        SELECT r.course_code, s.NAME, s.SURNAME
+        FROM REGISTRATION r
+        JOIN STUDENT s ON s.ID = r.student_id
+        WHERE r.course_code IN (SELECT value FROM json_each(?))
+    """, (json.dumps(sorted(set(course_codes))),))
+    for row in rows:
+        yield row[0], f"{row[1]} {row[2]}"
+
+# Function to load the rosters of many courses at once as {course code: [names]}.
+# Every requested course is in the result, empty if nobody is registered.
+def load_rosters(course_codes):
+    rosters = {course_code: [] for course_code in course_codes}
+    for course_code, student in iter_rosters(rosters):
+        rosters[course_code].append(student)
+    return rosters
+
+# Function to walk a keyset-paginated listing lazily. fetch_page takes the key
+# of the last row seen (None for the first page) and returns (rows, next key),
+# so only the page being looked at is ever held in memory.
+def iter_pages(fetch_page):
+    after = None
+    while True:
+        rows, after = fetch_page(after)
+        if rows:
+            yield rows
+        if after is None:
+            return
 
 # Define the User class
 class User:
+    __slots__ = ("username", "password", "role", "user_id", "token")
+
     def __init__(self, username, password, role):
         self.username = username
-        self.password = hash_password(password)
+        self.password = password  # As entered; only ever compared through the hasher, and dropped at login
         self.role = role
-
+        self.user_id = None  # USER.ID, set by authenticate() and kept for the session
+        self.token = None  # Session token, set by authenticate()
+
+    # While the session is live this is answered by the session store alone.
+    # Otherwise the password is checked against the stored hash on the hashing
+    # workers and a new session is started. A hash that is legacy SHA-256 or made
+    # with older settings is replaced after a successful login; if that write
+    # fails the login still succeeds and the upgrade is tried again next time.
     def authenticate(self):
-        cursor = database.execute("SELECT * FROM USER WHERE username = ? AND password = ?", (self.username, self.password))
-        return cursor.fetchone() is not None
+        if self.token is not None and sessions.get(self.token) is not None:
+            return True
+        if self.password is None:
+            return False
+        try:
+            with pool.connection() as database:
+                row = database.execute("SELECT ID, password, role FROM USER WHERE username = ?", (self.username,)).fetchone()
+            if not hasher.verify_in_pool(self.password, row[1] if row else None):
+                return False
+            user_id, stored, role = row
+            if role != self.role:
+                # Right password, but the account is not the kind being logged in as
+                return False
+            self.user_id = user_id
+            if hasher.needs_rehash(stored):
+                upgraded = hash_password(self.password)
+                try:
+                    write(lambda database: database.execute("UPDATE USER SET password = ? WHERE ID = ? AND password = ?", (upgraded, self.user_id, stored)))
+                except sql.OperationalError:
+                    pass
+            profile = None
+            if role in PROFILE_QUERIES:
+                with pool.connection() as database:
+                    found = database.execute(PROFILE_QUERIES[role], (self.username,)).fetchone()
+                if found:
+                    profile = dict(zip(("id", "name", "surname"), found))
+            self.token = sessions.create(self.user_id, self.username, role, profile)
+        finally:
+            # Never keep the plaintext password, whether or not the login succeeded
+            self.password = None
+        user_ids.add(pool, self.username, self.user_id)
+        return True
+
+    # End the session; the user has to log in with a password again
+    def logout(self):
+        sessions.revoke(self.token)
+        self.token = None
+
+    # USER.ID of this user, looked up once if the session was never authenticated
+    def resolve_user_id(self):
+        if self.user_id is None:
+            self.user_id = user_ids.resolve(pool, self.username)
+        return self.user_id
 
 # Define the Course class
-class Course:
-    def __init__(self, course_code, course_name, instructor, schedule):
-        self.course_code = course_code
-        self.course_name = course_name
-        self.instructor = instructor
-        self.schedule = schedule
+# Tuple-backed so the one built per schedule, search or catalog row has no
+# per-instance __dict__; rows already in field order can use Course._make(row)
+class Course(namedtuple("Course", ["course_code", "course_name", "instructor", "schedule"])):
+    __slots__ = ()
+
+# Define the RosterEntry class
+# One student on a course roster, as yielded by Admin.iter_roster_entries
+class RosterEntry(namedtuple("RosterEntry", ["student_id", "name", "surname"])):
+    __slots__ = ()
+
+    @property
+    def full_name(self):
+        return f"{self.name} {self.surname}"
 
 # Define the Student class, inheriting from User
 class Student(User):
+    __slots__ = ("schedule", "schedule_masks", "masks_stamp", "schedule_lock")
+
     def __init__(self, username, password, role='student'):
         super().__init__(username, password, role)
         self.schedule = []
+        self.schedule_masks = None  # (semester, year) -> OR of the registered courses' meeting masks
+        self.masks_stamp = None  # SCHEDULE_VERSION the masks were loaded at
+        self.schedule_lock = threading.RLock()  # Guards the three above; see holds_schedule_lock
+
+    # Return the cached (semester, year) -> meeting mask of the student's courses,
+    # loading the masks for every term in one query the first time, and again
+    # whenever the student's SCHEDULE_VERSION shows their registrations changed
+    @holds_schedule_lock
+    def current_masks(self, database):
+        row = database.execute("SELECT version FROM SCHEDULE_VERSION WHERE student_id = ?", (self.resolve_user_id(),)).fetchone()
+        stamp = row[0] if row else None
+        if self.schedule_masks is None or stamp != self.masks_stamp:
+            self.masks_stamp = stamp
+            masks = {}
+            cursor = database.execute("""
+                SELECT c.SEMESTER, c.YEAR, c.MEETING_MASK
+                FROM REGISTRATION r
+                JOIN COURSE c ON c.CRN = r.course_code
+                WHERE r.student_id = ?
+            """, (self.resolve_user_id(),))
+            for term_semester, term_year, blob in cursor:
+                masks[(term_semester, term_year)] = masks.get((term_semester, term_year), 0) | decode_mask(blob)
+            self.schedule_masks = masks
+        return self.schedule_masks
+
+    # Find which registered course overlaps a mask, only needed once a conflict is known
+    def conflicting_course(self, database, semester, year, mask):
+        return conflicting_course(database, self.resolve_user_id(), semester, year, mask)
+
+    # CRN of a registered course in the term that overlaps a mask, or None. The
+    # cached masks only rule conflicts out; an overlap is confirmed against the
+    # registrations, and if none is found the cache was stale and is dropped.
+    @holds_schedule_lock
+    def find_conflict(self, database, semester, year, mask, masks=None):
+        if masks is None:
+            masks = self.current_masks(database)
+        if not mask & masks.get((semester, year), 0):
+            return None
+        conflict = self.conflicting_course(database, semester, year, mask)
+        if conflict is None:
+            self.schedule_masks = None
+        return conflict
 
     def register_for_classes(self):
-        courses = []
-        cursor = database.execute("SELECT CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS FROM COURSE")
-        for row in cursor:
-            courses.append(f"{row[0]}: {row[1]}, {row[2]}, {row[3]}, {row[4]}, {row[5]}, {row[6]}, {row[7]} credits")
-        return courses
+        return catalog.listing(pool)
 
-    def add_course_to_schedule(self, course_code):
-        cursor = database.execute("SELECT * FROM COURSE WHERE CRN = ?", (course_code,))
-        course = cursor.fetchone()
-        if course:
-            self.schedule.append(Course(course[0], course[1], course[8], course[3]))
-            database.execute("INSERT INTO REGISTRATION (student_id, course_code) VALUES ((SELECT ID FROM USER WHERE username = ?), ?)", (self.username, course_code))
-            database.commit()
-            return "Course added to schedule and database updated."
-        else:
-            return "Invalid course code."
+    # One page of the catalog after CRN `after`, with the key of the next page
+    def course_page(self, after=None, page_size=PAGE_SIZE):
+        return catalog.page(pool, after, page_size)
+
+    def course_pages(self, page_size=PAGE_SIZE):
+        return iter_pages(lambda after: self.course_page(after, page_size))
 
+    # The catalog sorted and filtered in SQL, read a page at a time (see LeopardWebListing)
+    def course_listing(self, sort="crn", descending=False, text=""):
+        return CourseListing(pool, sort, descending, text)
+
+    @holds_schedule_lock
+    @retry_when_busy
+    def add_course_to_schedule(self, course_code):
+        student_id = self.resolve_user_id()
+        if student_id is None:
+            return "Student does not exist."
+        with pool.connection() as database:
+            course = database.execute("SELECT CRN, TITLE, instructor_id, TIME, SEMESTER, YEAR, MEETING_MASK FROM COURSE WHERE CRN = ?", (course_code,)).fetchone()
+            if course:
+                mask = decode_mask(course[6])
+                conflict = self.find_conflict(database, course[4], course[5], mask)
+                if conflict == course_code:
+                    return "You are already registered for this course."
+                if conflict is not None:
+                    return f"Time conflict with course {conflict} on your schedule."
+                try:
+                    status, position = write(reserve_or_wait, student_id, course_code)
+                except sql.IntegrityError:
+                    return "You are already registered for this course."
+                if status == "full":
+                    if position is None:
+                        return "Course is full. You are already registered or on the waitlist for this course."
+                    return f"Course is full. You are number {position} on the waitlist."
+                self.schedule_masks = None  # Reloaded at the new SCHEDULE_VERSION when next needed
+                self.schedule.append(Course._make(course[:4]))
+                return "Course added to schedule and database updated."
+            else:
+                return "Invalid course code."
+
+    # Register for a whole cart of CRNs at once, or for none of them. The cart is
+    # checked with one query (existence, free seats, current registrations and
+    # meeting masks), then every seat is taken and every registration inserted in
+    # one transaction with one commit.
+    @holds_schedule_lock
+    @retry_when_busy
+    def register_cart(self, course_codes):
+        student_id = self.resolve_user_id()
+        if student_id is None:
+            return "Student does not exist."
+        cart = sorted(set(course_codes))
+        if not cart:
+            return "Your cart is empty."
+        with pool.connection() as database:
+            rows = database.execute("""
+                SELECT c.CRN, c.TITLE, c.instructor_id, c.TIME, c.SEMESTER, c.YEAR, c.MEETING_MASK, c.ENROLLED < c.CAPACITY, r.student_id IS NOT NULL
+                FROM COURSE c
+                LEFT JOIN REGISTRATION r ON r.student_id = ? AND r.course_code = c.CRN
+                WHERE c.CRN IN (SELECT value FROM json_each(?))
+            """, (student_id, json.dumps(cart))).fetchall()
+            courses = {row[0]: row for row in rows}
+            problems = [f"{course_code}: Invalid course code." for course_code in cart if course_code not in courses]
+            cart_masks = {}
+            masks = self.current_masks(database)
+            for course_code, course in sorted(courses.items()):
+                term = (course[4], course[5])
+                mask = decode_mask(course[6])
+                if course[8]:
+                    problems.append(f"{course_code}: You are already registered for this course.")
+                elif not course[7]:
+                    problems.append(f"{course_code}: Course is full.")
+                else:
+                    conflict = self.find_conflict(database, *term, mask, masks)
+                    if conflict is not None:
+                        problems.append(f"{course_code}: Time conflict with course {conflict} on your schedule.")
+                    elif mask & cart_masks.get(term, 0):
+                        other = next(code for code in cart if code in courses and code < course_code and decode_mask(courses[code][6]) & mask)
+                        problems.append(f"{course_code}: Time conflict with course {other} in your cart.")
+                cart_masks[term] = cart_masks.get(term, 0) | mask
+            if problems:
+                return "No courses were added.\n" + "\n".join(problems)
+
+            try:
+                write(reserve_cart, student_id, cart)
+            except WriteAborted as error:
+                # Another student took a last seat since the check
+                return f"No courses were added.\n{error}"
+            except sql.IntegrityError:
+                return "No courses were added.\nYou are already registered for a course in your cart."
+        self.schedule_masks = None
+        self.schedule.extend(Course._make(courses[course_code][:4]) for course_code in cart)
+        return f"{len(cart)} courses added to schedule and database updated."
+
+    @holds_schedule_lock
     def see_schedule(self):
         self.schedule.clear()
-        cursor = database.execute("""
+        self.schedule_masks = None
+        self.schedule.extend(self.iter_schedule())
+        return self.schedule
+
+    # Yield the student's registered courses straight from the cursor
+    def iter_schedule(self):
+        rows = stream_rows("""
             SELECT c.CRN, c.TITLE, i.NAME, c.TIME
             FROM COURSE c
             JOIN REGISTRATION r ON c.CRN = r.course_code
-            JOIN USER u ON u.ID = r.student_id
             JOIN INSTRUCTOR i ON c.instructor_id = i.ID
-            WHERE u.username = ?
-        """, (self.username,))
-        for row in cursor:
-            course = Course(row[0], row[1], row[2], row[3])
-            self.schedule.append(course)
-        return self.schedule
+            WHERE r.student_id = ?
+        """, (self.resolve_user_id(),))
+        yield from map(Course._make, rows)
 
+    @holds_schedule_lock
+    @retry_when_busy
     def edit_schedule(self, action, course_code):
         if action == "add":
             return self.add_course_to_schedule(course_code)
         elif action == "drop":
             self.schedule = [course for course in self.schedule if course.course_code != course_code]
-            database.execute("DELETE FROM REGISTRATION WHERE student_id = (SELECT ID FROM USER WHERE username = ?) AND course_code = ?", (self.username, course_code))
-            database.commit()
+            self.schedule_masks = None
+            write(release_seat, self.resolve_user_id(), course_code)
             return "Course dropped from schedule."
         else:
             return "Invalid action."
 
 # Define the Instructor class, inheriting from User
 class Instructor(User):
+    __slots__ = ("courses_taught", "instructor_id")
+
     def __init__(self, username, password, role='instructor'):
         super().__init__(username, password, role)
         self.courses_taught = {}
+        self.instructor_id = None
+
+    # INSTRUCTOR.ID of this instructor, resolved from the username (kept in
+    # INSTRUCTOR.EMAIL) on first use and cached for the rest of the session
+    def resolve_instructor_id(self):
+        if self.instructor_id is None:
+            with pool.connection() as database:
+                row = database.execute("SELECT ID FROM INSTRUCTOR WHERE EMAIL = ?", (self.username,)).fetchone()
+            self.instructor_id = row[0] if row else None
+        return self.instructor_id
 
     def assign_course(self, course):
         self.courses_taught[course.course_name] = course
 
     def view_schedule(self):
         self.courses_taught.clear()
-        cursor = database.execute("SELECT * FROM COURSE WHERE instructor = ?", (self.username,))
-        for row in cursor:
-            course = Course(row[0], row[1], row[2], row[3])
+        for course in self.iter_schedule():
             self.courses_taught[course.course_name] = course
         return self.courses_taught
 
+    # Yield the courses the instructor teaches straight from the cursor, one
+    # seek on idx_course_instructor once the instructor ID is known
+    def iter_schedule(self):
+        instructor_id = self.resolve_instructor_id()
+        if instructor_id is None:
+            return
+        rows = stream_rows("SELECT CRN, TITLE, TIME FROM COURSE WHERE instructor_id = ? ORDER BY CRN", (instructor_id,))
+        for row in rows:
+            yield Course(row[0], row[1], self.username, row[2])
+
     def view_registered_students(self):
-        students = {}
-        for course_name, course in self.courses_taught.items():
-            students[course_name] = []
-            cursor = database.execute("SELECT s.NAME, s.SURNAME FROM STUDENT s JOIN REGISTRATION r ON s.ID = r.student_id WHERE r.course_code = ?", (course.course_code,))
-            for row in cursor:
-                students[course_name].append(f"{row[0]} {row[1]}")
+        students = {course_name: [] for course_name in self.courses_taught}
+        for course_name, student in self.iter_registered_students():
+            students[course_name].append(student)
         return students
 
+    # Yield (course name, student name) for every student in the courses taught,
+    # all sections in one query
+    def iter_registered_students(self):
+        names = {course.course_code: course_name for course_name, course in self.courses_taught.items()}
+        for course_code, student in iter_rosters(names):
+            yield names[course_code], student
+
 # Define the Admin class, inheriting from User
 class Admin(User):
+    __slots__ = ()
+
     def __init__(self, username, password, role='admin'):
         super().__init__(username, password, role)
 
-    def add_course(self, course_code, course_name, instructor, schedule, department, semester, year, credits):
-        database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, (SELECT ID FROM INSTRUCTOR WHERE EMAIL = ?))", 
-                         (course_code, course_name, department, schedule, 'N/A', semester, year, credits, instructor))
-        database.commit()
+    @retry_when_busy
+    def add_course(self, course_code, course_name, instructor, schedule, department, semester, year, credits, capacity=30):
+        days, time = split_schedule(schedule)
+        write(lambda database: database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor_id, CAPACITY, MEETING_MASK) VALUES (?, ?, ?, ?, ?, ?, ?, ?, (SELECT ID FROM INSTRUCTOR WHERE EMAIL = ?), ?, ?)", 
+                                                (course_code, course_name, department, time, days, semester, year, credits, instructor, capacity, encode_mask(meeting_mask(days, time)))))
+        catalog.add((course_code, course_name, department, time, days, semester, year, credits))
         return "Course added to system."
 
+    @retry_when_busy
     def remove_course(self, course_code):
-        database.execute("DELETE FROM COURSE WHERE CRN = ?", (course_code,))
-        database.commit()
+        def delete(database):
+            database.execute("DELETE FROM WAITLIST WHERE course_code = ?", (course_code,))
+            database.execute("DELETE FROM COURSE WHERE CRN = ?", (course_code,))
+        write(delete)
+        catalog.remove(course_code)
         return "Course removed from system."
 
+    @retry_when_busy
     def add_user(self, user_id, username, password, role, name, surname, gradyear='', major='', email='', title='', hireyear=0, dept='', office=''):
         hashed_password = hash_password(password)
-        try:
+
+        def insert(database):
             database.execute("INSERT INTO USER (ID, username, password, role) VALUES (?, ?, ?, ?)", (user_id, username, hashed_password, role))
             if role == 'student':
                 database.execute("INSERT INTO STUDENT (ID, NAME, SURNAME, USERNAME, GRADYEAR, MAJOR, EMAIL) VALUES (?, ?, ?, ?, ?, ?, ?)", 
@@ -134,39 +499,134 @@ class Admin(User):
             elif role == 'admin':
                 database.execute("INSERT INTO ADMIN (ID, NAME, SURNAME, TITLE, OFFICE, EMAIL) VALUES (?, ?, ?, ?, ?, ?)", 
                                  (user_id, name, surname, title, office, email))
-            database.commit()
+
+        try:
+            write(insert)
+            user_ids.add(pool, username, user_id)
             return "User added successfully."
         except sql.IntegrityError:
             return "ID number or username already exists. Try again."
 
+    @retry_when_busy
     def remove_user(self, username):
-        database.execute("DELETE FROM USER WHERE username = ?", (username,))
-        database.commit()
+        user_id = user_ids.resolve(pool, username)
+
+        def delete(database):
+            if user_id is not None:
+                # Give back the seats held by the user, promoting waitlisted students into them
+                database.execute("DELETE FROM WAITLIST WHERE student_id = ?", (user_id,))
+                courses = [row[0] for row in database.execute("SELECT course_code FROM REGISTRATION WHERE student_id = ?", (user_id,)).fetchall()]
+                for course_code in courses:
+                    release_seat(database, user_id, course_code)
+            database.execute("DELETE FROM USER WHERE username = ?", (username,))
+
+        write(delete)
+        user_ids.forget(username)
+        if user_id is not None:
+            sessions.revoke_user(user_id)
         return "User removed successfully."
 
+    @retry_when_busy
     def add_student_to_course(self, student_username, course_code):
-        database.execute("INSERT INTO REGISTRATION (student_id, course_code) VALUES ((SELECT ID FROM USER WHERE username = ?), ?)", (student_username, course_code))
-        database.commit()
+        student_id = user_ids.resolve(pool, student_username)
+        if student_id is None:
+            return "Student does not exist or is already in this course."
+        try:
+            status = write(reserve_seat, student_id, course_code)
+        except sql.IntegrityError:
+            return "Student does not exist or is already in this course."
+        if status != "added":
+            return "Course is full." if status == "full" else "Invalid course code."
         return "Student added to course."
 
+    @retry_when_busy
     def remove_student_from_course(self, student_username, course_code):
-        database.execute("DELETE FROM REGISTRATION WHERE student_id = (SELECT ID FROM USER WHERE username = ?) AND course_code = ?", (student_username, course_code))
-        database.commit()
+        student_id = user_ids.resolve(pool, student_username)
+        if student_id is None:
+            return "Student removed from course."
+        write(release_seat, student_id, course_code)
         return "Student removed from course."
 
     def view_all_courses(self):
-        courses = []
-        cursor = database.execute("SELECT CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS FROM COURSE")
-        for row in cursor:
-            courses.append(f"{row[0]}: {row[1]}, {row[2]}, {row[3]}, {row[4]}, {row[5]}, {row[6]}, {row[7]} credits")
-        return courses
+        return catalog.listing(pool)
+
+    # One page of the catalog after CRN `after`, with the key of the next page
+    def course_page(self, after=None, page_size=PAGE_SIZE):
+        return catalog.page(pool, after, page_size)
+
+    def course_pages(self, page_size=PAGE_SIZE):
+        return iter_pages(lambda after: self.course_page(after, page_size))
+
+    # The catalog sorted and filtered in SQL, read a page at a time (see LeopardWebListing)
+    def course_listing(self, sort="crn", descending=False, text=""):
+        return CourseListing(pool, sort, descending, text)
+
+    # A course roster sorted and filtered in SQL, read a page at a time
+    def roster_listing(self, course_code, sort="id", descending=False, text=""):
+        return RosterListing(pool, course_code, sort, descending, text)
 
     def view_roster(self, course_code):
-        roster = []
-        cursor = database.execute("SELECT s.NAME, s.SURNAME FROM STUDENT s JOIN REGISTRATION r ON s.ID = r.student_id WHERE r.course_code = ?", (course_code,))
-        for row in cursor:
-            roster.append(f"{row[0]} {row[1]}")
-        return roster
+        return list(self.iter_roster(course_code))
+
+    # Yield the names on a course roster straight from the cursor
+    def iter_roster(self, course_code):
+        rows = stream_rows("SELECT s.NAME, s.SURNAME FROM STUDENT s JOIN REGISTRATION r ON s.ID = r.student_id WHERE r.course_code = ?", (course_code,))
+        for row in rows:
+            yield f"{row[0]} {row[1]}"
+
+    # Rosters of any number of courses in one query, as {course code: [names]}
+    def view_rosters(self, course_codes):
+        return load_rosters(course_codes)
+
+    # Yield RosterEntry records for a course, for reports that need the student ID
+    def iter_roster_entries(self, course_code):
+        rows = stream_rows("SELECT s.ID, s.NAME, s.SURNAME FROM STUDENT s JOIN REGISTRATION r ON s.ID = r.student_id WHERE r.course_code = ?", (course_code,))
+        yield from map(RosterEntry._make, rows)
+
+    # One page of a course roster in student ID order after student `after`. The
+    # (course_code, student_id) index serves the seek and the order directly.
+    def roster_page(self, course_code, after=None, page_size=PAGE_SIZE):
+        with pool.connection() as database:
+            rows = database.execute("""
+                SELECT r.student_id, s.NAME, s.SURNAME
+                FROM REGISTRATION r
+                JOIN STUDENT s ON s.ID = r.student_id
+                WHERE r.course_code = ? AND r.student_id > ?
+                ORDER BY r.student_id
+                LIMIT ?
+            """, (course_code, -1 if after is None else after, page_size + 1)).fetchall()
+        names = [f"{row[1]} {row[2]}" for row in rows[:page_size]]
+        return names, (rows[page_size - 1][0] if len(rows) > page_size else None)
+
+    def roster_pages(self, course_code, page_size=PAGE_SIZE):
+        return iter_pages(lambda after: self.roster_page(course_code, after, page_size))
+
+# Function to search courses through the full-text index (see LeopardWebSearch), best matches first
+def search_courses(parameter, value, limit=RESULT_LIMIT):
+    with pool.connection() as database:
+        return list(map(Course._make, find_courses(database, parameter, value, limit)))
+
+# Function to rebuild the logged-in user of a session token, e.g. for a request
+# from another client, without the password or a USER lookup. Returns None if
+# the token is forged, expired or revoked, or the session's role has no class.
+def resume_session(token):
+    session = sessions.get(token)
+    if session is None:
+        return None
+    user_class = {"student": Student, "instructor": Instructor, "admin": Admin}.get(session.role)
+    if user_class is None:
+        return None
+    user = user_class(session.username, None)
+    user.user_id = session.user_id
+    user.token = token
+    if isinstance(user, Instructor) and session.profile:
+        user.instructor_id = session.profile["id"]
+    return user
+
+# Columns of the course and roster lists as (listing column, heading, width)
+COURSE_LIST_COLUMNS = [("crn", "CRN", 60), ("title", "Title", 180), ("department", "Department", 90), ("instructor", "Instructor", 100),
+                       ("days", "Days", 50), ("time", "Time", 90), ("semester", "Semester", 70), ("credits", "Credits", 55), ("seats", "Seats left", 70)]
+ROSTER_LIST_COLUMNS = [("id", "ID", 60), ("name", "First name", 120), ("surname", "Last name", 120), ("major", "Major", 80), ("gradyear", "Grad year", 70)]
 
 # GUI Implementation
 class RegistrationSystemApp:
@@ -174,68 +634,162 @@ class RegistrationSystemApp:
         self.root = root
         self.root.title("College Registration System")
 
+        # Database calls run on these workers so the window never freezes
+        self.tasks = BackgroundTasks(root)
+
+        # Each screen is built once, on first use, and kept in this container;
+        # navigating raises the cached frame instead of rebuilding it
+        self.user = None
+        self.screens = {}
+        self.container = tk.Frame(self.root)
+        self.container.pack(fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+
         # Main menu
         self.main_menu()
 
-    def main_menu(self):
-        self.clear_screen()
-        tk.Label(self.root, text="Main Menu", font=("Helvetica", 16)).pack(pady=10)
-        tk.Button(self.root, text="Login", command=self.login_screen).pack(pady=5)
-        tk.Button(self.root, text="Register", command=self.register_screen).pack(pady=5)
-        tk.Button(self.root, text="Exit", command=self.root.quit).pack(pady=5)
+    # Raise the named screen, building it with build(frame) the first time
+    def show_screen(self, name, build):
+        frame = self.screens.get(name)
+        if frame is None:
+            frame = tk.Frame(self.container)
+            build(frame)
+            frame.grid(row=0, column=0, sticky="nsew")
+            self.screens[name] = frame
+        frame.tkraise()
+        return frame
+
+    # Run a data-access call off the Tk thread and pass its result to on_done back
+    # on it. A progress window with a Cancel button appears if it takes a while.
+    def in_background(self, call, on_done, message="Working..."):
+        task = self.tasks.submit(call, on_done, self.show_error)
+        self.show_progress(task, message)
+        return task
+
+    # Like in_background, for a generator: on_done gets the list of what it
+    # yielded, and the progress window counts the rows as they arrive
+    def in_background_steps(self, steps, on_done, message="Loading..."):
+        task = self.tasks.submit_steps(steps, on_done, self.show_error)
+        self.show_progress(task, message)
+        return task
+
+    # Open a small window with the task's progress and a Cancel button once it
+    # has run longer than `delay` milliseconds; it closes when the task finishes
+    def show_progress(self, task, message, delay=300):
+        def open_window():
+            if task.finished or task.cancelled:
+                return
+            window = tk.Toplevel(self.root)
+            window.title("Please wait")
+            label = tk.Label(window, text=message)
+            label.pack(padx=20, pady=10)
+
+            def cancel():
+                task.cancel()
+                window.destroy()
+
+            tk.Button(window, text="Cancel", command=cancel).pack(pady=5)
+
+            def refresh():
+                if not window.winfo_exists():
+                    return
+                if task.finished:
+                    window.destroy()
+                    return
+                if task.progress:
+                    label.config(text=f"{message} {task.progress} rows")
+                window.after(100, refresh)
+
+            refresh()
+
+        self.root.after(delay, open_window)
+
+    def show_result(self, result):
+        messagebox.showinfo("Result", result)
 
-    def clear_screen(self):
-        for widget in self.root.winfo_children():
-            widget.destroy()
+    def show_error(self, error):
+        messagebox.showerror("Error", str(error))
+
+    def main_menu(self):
+        self.show_screen("main", self.build_main_menu)
+
+    def build_main_menu(self, frame):
+        tk.Label(frame, text="Main Menu", font=("Helvetica", 16)).pack(pady=10)
+        tk.Button(frame, text="Login", command=self.login_screen).pack(pady=5)
+        tk.Button(frame, text="Register", command=self.register_screen).pack(pady=5)
+        tk.Button(frame, text="Exit", command=self.root.quit).pack(pady=5)
+
+    # Forget the signed-in user and go back to the main menu
+    def logout(self):
+        if self.user is not None:
+            self.user.logout()
+        self.user = None
+        self.main_menu()
 
     def login_screen(self):
-        self.clear_screen()
-        tk.Label(self.root, text="Login", font=("Helvetica", 16)).pack(pady=10)
+        self.show_screen("login", self.build_login_screen)
+        # The screen is reused, so nothing typed by the last person is left in it
+        for entry in self.login_entries:
+            entry.delete(0, tk.END)
+        self.login_entries[0].focus_set()
+
+    def build_login_screen(self, frame):
+        tk.Label(frame, text="Login", font=("Helvetica", 16)).pack(pady=10)
 
-        role_label = tk.Label(self.root, text="Role:")
+        role_label = tk.Label(frame, text="Role:")
         role_label.pack(pady=5)
-        self.role_entry = tk.Entry(self.root)
-        self.role_entry.pack(pady=5)
+        role_entry = tk.Entry(frame)
+        role_entry.pack(pady=5)
 
-        username_label = tk.Label(self.root, text="Username:")
+        username_label = tk.Label(frame, text="Username:")
         username_label.pack(pady=5)
-        self.username_entry = tk.Entry(self.root)
-        self.username_entry.pack(pady=5)
+        username_entry = tk.Entry(frame)
+        username_entry.pack(pady=5)
 
-        password_label = tk.Label(self.root, text="Password:")
+        password_label = tk.Label(frame, text="Password:")
         password_label.pack(pady=5)
-        self.password_entry = tk.Entry(self.root, show="*")
-        self.password_entry.pack(pady=5)
+        password_entry = tk.Entry(frame, show="*")
+        password_entry.pack(pady=5)
+        self.login_entries = (role_entry, username_entry, password_entry)
 
-        tk.Button(self.root, text="Login", command=self.login).pack(pady=5)
-        tk.Button(self.root, text="Back", command=self.main_menu).pack(pady=5)
+        tk.Button(frame, text="Login", command=self.login).pack(pady=5)
+        tk.Button(frame, text="Back", command=self.main_menu).pack(pady=5)
 
     def register_screen(self):
-        self.clear_screen()
-        tk.Label(self.root, text="Register", font=("Helvetica", 16)).pack(pady=10)
+        self.show_screen("register", self.build_register_screen)
+        for entry in self.register_entries:
+            entry.delete(0, tk.END)
+        self.register_entries[0].focus_set()
 
-        role_label = tk.Label(self.root, text="Role:")
+    def build_register_screen(self, frame):
+        tk.Label(frame, text="Register", font=("Helvetica", 16)).pack(pady=10)
+
+        role_label = tk.Label(frame, text="Role:")
         role_label.pack(pady=5)
-        self.role_entry = tk.Entry(self.root)
-        self.role_entry.pack(pady=5)
+        role_entry = tk.Entry(frame)
+        role_entry.pack(pady=5)
 
-        username_label = tk.Label(self.root, text="Username:")
+        username_label = tk.Label(frame, text="Username:")
         username_label.pack(pady=5)
-        self.username_entry = tk.Entry(self.root)
-        self.username_entry.pack(pady=5)
+        username_entry = tk.Entry(frame)
+        username_entry.pack(pady=5)
 
-        password_label = tk.Label(self.root, text="Password:")
+        password_label = tk.Label(frame, text="Password:")
         password_label.pack(pady=5)
-        self.password_entry = tk.Entry(self.root, show="*")
-        self.password_entry.pack(pady=5)
+        password_entry = tk.Entry(frame, show="*")
+        password_entry.pack(pady=5)
+        self.register_entries = (role_entry, username_entry, password_entry)
 
-        tk.Button(self.root, text="Register", command=self.register).pack(pady=5)
-        tk.Button(self.root, text="Back", command=self.main_menu).pack(pady=5)
+        tk.Button(frame, text="Register", command=self.register).pack(pady=5)
+        tk.Button(frame, text="Back", command=self.main_menu).pack(pady=5)
 
     def login(self):
-        role = self.role_entry.get().lower()
-        username = self.username_entry.get()
-        password = self.password_entry.get()
+        role_entry, username_entry, password_entry = self.login_entries
+        role = role_entry.get().lower()
+        username = username_entry.get()
+        password = password_entry.get()
+        password_entry.delete(0, tk.END)
 
         if role == "student":
             user = Student(username, password)
@@ -247,8 +801,11 @@ class RegistrationSystemApp:
             messagebox.showerror("Error", "Invalid role. Try again.")
             return
 
-        if user.authenticate():
-            messagebox.showinfo("Success", f"Login successful. Welcome, {username}!")
+        self.in_background(user.authenticate, lambda authenticated: self.finish_login(user, role, authenticated), "Logging in...")
+
+    def finish_login(self, user, role, authenticated):
+        if authenticated:
+            messagebox.showinfo("Success", f"Login successful. Welcome, {user.username}!")
             self.user = user
             if role == "student":
                 self.student_menu()
@@ -260,43 +817,58 @@ class RegistrationSystemApp:
             messagebox.showerror("Error", "Login failed. Invalid credentials.")
       
     def register(self):
-        role = self.role_entry.get().lower()
-        username = self.username_entry.get()
-        password = self.password_entry.get()
+        role_entry, username_entry, password_entry = self.register_entries
+        role = role_entry.get().lower()
+        username = username_entry.get()
+        password = password_entry.get()
 
-        hashed_password = hash_password(password)
-        try:
+        # Ask everything first, so the dialogs are not shown with a transaction open
+        if role == 'student':
+            name = simpledialog.askstring("Input", "Enter student's first name:")
+            surname = simpledialog.askstring("Input", "Enter student's last name:")
+            gradyear = simpledialog.askstring("Input", "Enter student's graduation year:")
+            major = simpledialog.askstring("Input", "Enter student's major:")
+            email = simpledialog.askstring("Input", "Enter student's email:")
+            profile = ("INSERT INTO STUDENT (NAME, SURNAME, USERNAME, GRADYEAR, MAJOR, EMAIL) VALUES (?, ?, ?, ?, ?, ?)", 
+                       (name, surname, username, gradyear, major, email))
+        elif role == 'instructor':
+            name = simpledialog.askstring("Input", "Enter instructor's first name:")
+            surname = simpledialog.askstring("Input", "Enter instructor's last name:")
+            title = simpledialog.askstring("Input", "Enter instructor's title:")
+            hireyear = simpledialog.askinteger("Input", "Enter instructor's hire year:")
+            dept = simpledialog.askstring("Input", "Enter instructor's department:")
+            email = simpledialog.askstring("Input", "Enter instructor's email:")
+            profile = ("INSERT INTO INSTRUCTOR (NAME, SURNAME, USERNAME, TITLE, HIREYEAR, DEPT, EMAIL) VALUES (?, ?, ?, ?, ?, ?, ?)", 
+                       (name, surname, username, title, hireyear, dept, email))
+        elif role == 'admin':
+            name = simpledialog.askstring("Input", "Enter admin's first name:")
+            surname = simpledialog.askstring("Input", "Enter admin's last name:")
+            title = simpledialog.askstring("Input", "Enter admin's title:")
+            office = simpledialog.askstring("Input", "Enter admin's office:")
+            email = simpledialog.askstring("Input", "Enter admin's email:")
+            profile = ("INSERT INTO ADMIN (NAME, SURNAME, TITLE, OFFICE, EMAIL) VALUES (?, ?, ?, ?, ?)", 
+                       (name, surname, title, office, email))
+        else:
+            profile = None
+
+        def insert(database, hashed_password):
             database.execute("INSERT INTO USER (username, password, role) VALUES (?, ?, ?)", (username, hashed_password, role))
-            if role == 'student':
-                name = simpledialog.askstring("Input", "Enter student's first name:")
-                surname = simpledialog.askstring("Input", "Enter student's last name:")
-                gradyear = simpledialog.askstring("Input", "Enter student's graduation year:")
-                major = simpledialog.askstring("Input", "Enter student's major:")
-                email = simpledialog.askstring("Input", "Enter student's email:")
-                database.execute("INSERT INTO STUDENT (NAME, SURNAME, USERNAME, GRADYEAR, MAJOR, EMAIL) VALUES (?, ?, ?, ?, ?, ?)", 
-                                (name, surname, username, gradyear, major, email))
-            elif role == 'instructor':
-                name = simpledialog.askstring("Input", "Enter instructor's first name:")
-                surname = simpledialog.askstring("Input", "Enter instructor's last name:")
-                title = simpledialog.askstring("Input", "Enter instructor's title:")
-                hireyear = simpledialog.askinteger("Input", "Enter instructor's hire year:")
-                dept = simpledialog.askstring("Input", "Enter instructor's department:")
-                email = simpledialog.askstring("Input", "Enter instructor's email:")
-                database.execute("INSERT INTO INSTRUCTOR (NAME, SURNAME, USERNAME, TITLE, HIREYEAR, DEPT, EMAIL) VALUES (?, ?, ?, ?, ?, ?, ?)", 
-                                (name, surname, username, title, hireyear, dept, email))
-            elif role == 'admin':
-                name = simpledialog.askstring("Input", "Enter admin's first name:")
-                surname = simpledialog.askstring("Input", "Enter admin's last name:")
-                title = simpledialog.askstring("Input", "Enter admin's title:")
-                office = simpledialog.askstring("Input", "Enter admin's office:")
-                email = simpledialog.askstring("Input", "Enter admin's email:")
-                database.execute("INSERT INTO ADMIN (NAME, SURNAME, TITLE, OFFICE, EMAIL) VALUES (?, ?, ?, ?, ?)", 
-                                (name, surname, title, office, email))
-            database.commit()
+            if profile:
+                database.execute(*profile)
+
+        def registered(result):
             messagebox.showinfo("Success", "Registration successful.")
             self.main_menu()
-        except sql.IntegrityError:
-            messagebox.showerror("Error", "Username already exists. Try again.")
+
+        def failed(error):
+            if isinstance(error, sql.IntegrityError):
+                messagebox.showerror("Error", "Username already exists. Try again.")
+            else:
+                self.show_error(error)
+
+        # The password is hashed on the worker too, before the write starts
+        task = self.tasks.submit(lambda: write(insert, hash_password(password)), registered, failed)
+        self.show_progress(task, "Registering...")
 
     # def register(self):
     #     role = self.role_entry.get().lower()
@@ -334,23 +906,82 @@ class RegistrationSystemApp:
     #         messagebox.showerror("Error", "Username already exists. Try again.")
 
     def student_menu(self):
-        self.clear_screen()
-        tk.Label(self.root, text="Student Menu", font=("Helvetica", 16)).pack(pady=10)
-        tk.Button(self.root, text="Register for classes", command=self.register_for_classes).pack(pady=5)
-        tk.Button(self.root, text="See schedule", command=self.see_schedule).pack(pady=5)
-        tk.Button(self.root, text="Edit schedule", command=self.edit_schedule).pack(pady=5)
-        tk.Button(self.root, text="Logout", command=self.main_menu).pack(pady=5)
-
+        self.show_screen("student", self.build_student_menu)
+
+    def build_student_menu(self, frame):
+        tk.Label(frame, text="Student Menu", font=("Helvetica", 16)).pack(pady=10)
+        tk.Button(frame, text="Register for classes", command=self.register_for_classes).pack(pady=5)
+        tk.Button(frame, text="Register for a cart", command=self.register_cart).pack(pady=5)
+        tk.Button(frame, text="See schedule", command=self.see_schedule).pack(pady=5)
+        tk.Button(frame, text="Edit schedule", command=self.edit_schedule).pack(pady=5)
+        tk.Button(frame, text="Logout", command=self.logout).pack(pady=5)
+
+    # Open a window that shows one page of a listing at a time; the next page
+    # is only fetched, in the background, when asked for
+    def show_pages(self, title, heading, pages):
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        text = tk.Label(window, justify="left", anchor="w", text="Loading...")
+        text.pack(padx=10, pady=10, fill="x")
+        next_button = tk.Button(window, text="Next page")
+        next_button.pack(side="left", padx=10, pady=5)
+        tk.Button(window, text="Close", command=window.destroy).pack(side="right", padx=10, pady=5)
+        shown = []
+
+        def show(page):
+            if not window.winfo_exists():
+                return
+            if page is None:
+                if not shown:
+                    text.config(text=f"{heading}\n(none)")
+                return
+            shown.append(True)
+            text.config(text=heading + "\n" + "\n".join(page))
+            next_button.config(state="normal")
+
+        def show_next():
+            # Disabled while a page loads, so the generator is only ever advanced by one worker
+            next_button.config(state="disabled")
+            self.in_background(lambda: next(pages, None), show, "Loading page...")
+
+        next_button.config(command=show_next)
+        show_next()
+
+    # Open a window with a scrolling list over a listing; only the rows in view
+    # are fetched and drawn, and sorting and filtering are done by the query
+    def show_listing(self, title, make_listing, columns, on_activate=None):
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        view = VirtualList(window, self.tasks, make_listing, columns, on_activate=on_activate)
+        view.pack(fill="both", expand=True)
+        tk.Button(window, text="Close", command=window.destroy).pack(side="right", padx=10, pady=5)
+        return window, view
+
+    # Browse the catalog and register for a course by double-clicking it or
+    # selecting it and pressing Register
     def register_for_classes(self):
-        courses = self.user.register_for_classes()
-        course_list = "\n".join(courses)
-        course_code = simpledialog.askinteger("Input", f"Available Classes:\n{course_list}\nEnter the course code you want to register for:")
-        if course_code:
-            result = self.user.add_course_to_schedule(course_code)
-            messagebox.showinfo("Result", result)
+        window, view = self.show_listing("Register for Classes", self.user.course_listing, COURSE_LIST_COLUMNS, self.register_course)
+        tk.Button(window, text="Register", command=view.activate).pack(side="left", padx=10, pady=5)
+
+    def register_course(self, values):
+        course_code = int(values[0])
+        self.in_background(lambda: self.user.add_course_to_schedule(course_code), self.show_result, "Registering...")
+
+    def register_cart(self):
+        codes = simpledialog.askstring("Input", "Enter the course codes to register for, separated by spaces or commas:")
+        if not codes:
+            return
+        try:
+            cart = [int(code) for code in codes.replace(",", " ").split()]
+        except ValueError:
+            messagebox.showerror("Error", "Course codes must be numbers.")
+            return
+        self.in_background(lambda: self.user.register_cart(cart), self.show_result, "Registering...")
 
     def see_schedule(self):
-        schedule = self.user.see_schedule()
+        self.in_background(self.user.see_schedule, self.show_schedule, "Loading schedule...")
+
+    def show_schedule(self, schedule):
         schedule_list = "\n".join([f"{course.course_code}: {course.course_name} - {course.instructor} - {course.schedule}" for course in schedule])
         messagebox.showinfo("Schedule", f"Your Schedule:\n{schedule_list}")
 
@@ -359,59 +990,65 @@ class RegistrationSystemApp:
         if action in ["add", "drop"]:
             course_code = simpledialog.askinteger("Input", "Enter the course code:")
             if course_code:
-                result = self.user.edit_schedule(action, course_code)
-                messagebox.showinfo("Result", result)
+                self.in_background(lambda: self.user.edit_schedule(action, course_code), self.show_result, "Updating schedule...")
         else:
             messagebox.showerror("Error", "Invalid action.")
 
     def instructor_menu(self):
-        self.clear_screen()
-        tk.Label(self.root, text="Instructor Menu", font=("Helvetica", 16)).pack(pady=10)
-        tk.Button(self.root, text="View schedule", command=self.view_schedule).pack(pady=5)
-        tk.Button(self.root, text="View registered students", command=self.view_registered_students).pack(pady=5)
-        tk.Button(self.root, text="Logout", command=self.main_menu).pack(pady=5)
+        self.show_screen("instructor", self.build_instructor_menu)
+
+    def build_instructor_menu(self, frame):
+        tk.Label(frame, text="Instructor Menu", font=("Helvetica", 16)).pack(pady=10)
+        tk.Button(frame, text="View schedule", command=self.view_schedule).pack(pady=5)
+        tk.Button(frame, text="View registered students", command=self.view_registered_students).pack(pady=5)
+        tk.Button(frame, text="Logout", command=self.logout).pack(pady=5)
 
     def view_schedule(self):
-        courses = self.user.view_schedule()
-        course_list = "\n".join([f"{course.course_code}: {course.course_name} - {course.instructor} - {course.schedule}" for course in courses.values()])
-        messagebox.showinfo("Schedule", f"Your Schedule:\n{course_list}")
+        self.in_background(self.user.view_schedule, lambda courses: self.show_schedule(courses.values()), "Loading schedule...")
 
     def view_registered_students(self):
-        students = self.user.view_registered_students()
-        for course_name, student_list in students.items():
-            student_names = "\n".join(student_list)
-            messagebox.showinfo("Registered Students", f"Course: {course_name}\nStudents:\n{student_names}")
+        self.in_background_steps(self.user.iter_registered_students, self.show_registered_students, "Loading students...")
+
+    def show_registered_students(self, rows):
+        students = {course_name: [] for course_name in self.user.courses_taught}
+        for course_name, student in rows:
+            students[course_name].append(student)
+        # One page per course in a single window rather than one dialog per course
+        pages = iter([[f"Course: {course_name}", "Students:"] + student_list for course_name, student_list in students.items()])
+        self.show_pages("Registered Students", "Registered Students", pages)
 
     def admin_menu(self):
-        self.clear_screen()
-        tk.Label(self.root, text="Admin Menu", font=("Helvetica", 16)).pack(pady=10)
-        tk.Button(self.root, text="Add course", command=self.add_course).pack(pady=5)
-        tk.Button(self.root, text="Remove course", command=self.remove_course).pack(pady=5)
-        tk.Button(self.root, text="Add user", command=self.add_user).pack(pady=5)
-        tk.Button(self.root, text="Remove user", command=self.remove_user).pack(pady=5)
-        tk.Button(self.root, text="Add student to course", command=self.add_student_to_course).pack(pady=5)
-        tk.Button(self.root, text="Remove student from course", command=self.remove_student_from_course).pack(pady=5)
-        tk.Button(self.root, text="View all courses", command=self.view_all_courses).pack(pady=5)
-        tk.Button(self.root, text="View roster", command=self.view_roster).pack(pady=5)
-        tk.Button(self.root, text="Logout", command=self.main_menu).pack(pady=5)
+        self.show_screen("admin", self.build_admin_menu)
+
+    def build_admin_menu(self, frame):
+        tk.Label(frame, text="Admin Menu", font=("Helvetica", 16)).pack(pady=10)
+        tk.Button(frame, text="Add course", command=self.add_course).pack(pady=5)
+        tk.Button(frame, text="Remove course", command=self.remove_course).pack(pady=5)
+        tk.Button(frame, text="Add user", command=self.add_user).pack(pady=5)
+        tk.Button(frame, text="Remove user", command=self.remove_user).pack(pady=5)
+        tk.Button(frame, text="Add student to course", command=self.add_student_to_course).pack(pady=5)
+        tk.Button(frame, text="Remove student from course", command=self.remove_student_from_course).pack(pady=5)
+        tk.Button(frame, text="View all courses", command=self.view_all_courses).pack(pady=5)
+        tk.Button(frame, text="View roster", command=self.view_roster).pack(pady=5)
+        tk.Button(frame, text="Logout", command=self.logout).pack(pady=5)
 
     def add_course(self):
         course_code = simpledialog.askinteger("Input", "Enter course code:")
         course_name = simpledialog.askstring("Input", "Enter course name:")
         instructor = simpledialog.askstring("Input", "Enter instructor username:")
-        schedule = simpledialog.askstring("Input", "Enter schedule:")
+        schedule = simpledialog.askstring("Input", "Enter schedule (e.g. MWF 8:00-8:50):")
         department = simpledialog.askstring("Input", "Enter department:")
         semester = simpledialog.askstring("Input", "Enter semester:")
         year = simpledialog.askinteger("Input", "Enter year:")
         credits = simpledialog.askinteger("Input", "Enter credits:")
-        result = self.user.add_course(course_code, course_name, instructor, schedule, department, semester, year, credits)
-        messagebox.showinfo("Result", result)
+        capacity = simpledialog.askinteger("Input", "Enter seat capacity:", initialvalue=30)
+        self.in_background(lambda: self.user.add_course(course_code, course_name, instructor, schedule, department, semester, year, credits, capacity or 30),
+                           self.show_result, "Adding course...")
 
     def remove_course(self):
         course_code = simpledialog.askinteger("Input", "Enter course code to remove:")
         if course_code:
-            result = self.user.remove_course(course_code)
-            messagebox.showinfo("Result", result)
+            self.in_background(lambda: self.user.remove_course(course_code), self.show_result, "Removing course...")
 
     def add_user(self):
         user_id = simpledialog.askinteger("Input", "Enter new ID number:")
@@ -434,45 +1071,43 @@ class RegistrationSystemApp:
             title = simpledialog.askstring("Input", "Enter title:")
             office = simpledialog.askstring("Input", "Enter office:")
             email = simpledialog.askstring("Input", "Enter email:")
-        result = self.user.add_user(user_id, username, password, role, name, surname, gradyear, major, email, title, hireyear, dept, office)
-        messagebox.showinfo("Result", result)
+        self.in_background(lambda: self.user.add_user(user_id, username, password, role, name, surname, gradyear, major, email, title, hireyear, dept, office),
+                           self.show_result, "Adding user...")
 
     def remove_user(self):
         username = simpledialog.askstring("Input", "Enter username to remove:")
         if username:
-            result = self.user.remove_user(username)
-            messagebox.showinfo("Result", result)
+            self.in_background(lambda: self.user.remove_user(username), self.show_result, "Removing user...")
 
     def add_student_to_course(self):
         student_username = simpledialog.askstring("Input", "Enter student username:")
         course_code = simpledialog.askinteger("Input", "Enter course code:")
         if student_username and course_code:
-            result = self.user.add_student_to_course(student_username, course_code)
-            messagebox.showinfo("Result", result)
+            self.in_background(lambda: self.user.add_student_to_course(student_username, course_code), self.show_result, "Adding student...")
 
     def remove_student_from_course(self):
         student_username = simpledialog.askstring("Input", "Enter student username:")
         course_code = simpledialog.askinteger("Input", "Enter course code:")
         if student_username and course_code:
-            result = self.user.remove_student_from_course(student_username, course_code)
-            messagebox.showinfo("Result", result)
+            self.in_background(lambda: self.user.remove_student_from_course(student_username, course_code), self.show_result, "Removing student...")
 
     def view_all_courses(self):
-        courses = self.user.view_all_courses()
-        course_list = "\n".join(courses)
-        messagebox.showinfo("Courses", f"All Courses:\n{course_list}")
+        self.show_listing("All Courses", self.user.course_listing, COURSE_LIST_COLUMNS)
 
     def view_roster(self):
         course_code = simpledialog.askinteger("Input", "Enter course code:")
         if course_code:
-            roster = self.user.view_roster(course_code)
-            roster_list = "\n".join(roster)
-            messagebox.showinfo("Roster", f"Roster for Course Code {course_code}:\n{roster_list}")
+            self.show_listing(f"Roster for Course Code {course_code}",
+                              lambda sort, descending, text: self.user.roster_listing(course_code, sort, descending, text), ROSTER_LIST_COLUMNS)
 
 if __name__ == "__main__":
+    with pool.connection() as database:
+        migrate(database)
     root = tk.Tk()
     app = RegistrationSystemApp(root)
     root.mainloop()
+    app.tasks.shutdown()
+    hasher.shutdown()
 
 #Works but doesnt add users to correct database table
 #doesnt prompt instructors or admin the correct questions when they register
@@ -0,0 +1,407 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3 as sql
+import subprocess
+import tempfile
+import threading
+import time
+
+import FinalLeopardWebCode as app
+from LeopardWebGenerator import FIRST_NAMES, SUBJECTS, populate_database
+from LeopardWebPasswords import SCHEMES, calibrate
+from LeopardWebPool import ConnectionPool, DEFAULT_PROFILE, LEGACY_PROFILE
+from LeopardWebSearch import find_courses
+
+# Function to build a generated campus database file for a benchmark
+def create_campus_database(path, **parameters):
+    database = sql.connect(path)
+    populate_database(database, **parameters)
+    database.close()
+
+# Function to run concurrent roster readers and registration writers against one profile
+def benchmark_storage(profile, readers=4, writers=2, duration=2.0, students=5000, sections=500):
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    create_campus_database(path, students=students, instructors=max(sections // 4, 1), sections=sections)
+    crns = [10001 + i for i in range(sections)]
+    pool = ConnectionPool(path, size=readers + writers, profile=profile)
+    counts = {"reads": 0, "writes": 0, "busy": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def read_loop(seed):
+        rng = random.Random(seed)
+        done = 0
+        while time.perf_counter() < deadline:
+            with pool.connection() as database:
+                database.execute("SELECT s.NAME, s.SURNAME FROM STUDENT s JOIN REGISTRATION r ON s.ID = r.student_id WHERE r.course_code = ?",
+                                 (rng.choice(crns),)).fetchall()
+            done += 1
+        with lock:
+            counts["reads"] += done
+
+    def register(student_id, course_code):
+        with pool.connection() as database:
+            database.execute("INSERT OR IGNORE INTO REGISTRATION (student_id, course_code) VALUES (?, ?)", (student_id, course_code))
+            database.commit()
+
+    def write_loop(seed):
+        rng = random.Random(seed)
+        done = busy = 0
+        while time.perf_counter() < deadline:
+            try:
+                pool.run(register, rng.randrange(1, students + 1), rng.choice(crns))
+                done += 1
+            except sql.OperationalError:
+                busy += 1
+        with lock:
+            counts["writes"] += done
+            counts["busy"] += busy
+
+    threads = [threading.Thread(target=read_loop, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=write_loop, args=(1000 + i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    return {
+        "journal_mode": profile.journal_mode,
+        "reads_per_second": counts["reads"] / duration,
+        "writes_per_second": counts["writes"] / duration,
+        "busy_errors": counts["busy"],
+    }
+
+# Function to compare SQLite's default settings with the application storage profile
+def compare_storage_profiles(readers=4, writers=2, duration=2.0):
+    results = []
+    for name, profile in (("before (legacy)", LEGACY_PROFILE), ("after (default)", DEFAULT_PROFILE)):
+        result = benchmark_storage(profile, readers, writers, duration)
+        result["profile"] = name
+        results.append(result)
+    return results
+
+# Function to compare registration write throughput with one commit per write
+# against group commit, with `writers` threads registering at once
+def benchmark_group_commit(writers=8, duration=2.0, students=5000, sections=500):
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    create_campus_database(path, students=students, instructors=max(sections // 4, 1), sections=sections)
+    crns = [10001 + i for i in range(sections)]
+    original_pool = app.pool
+    app.pool = ConnectionPool(path, size=writers)
+
+    def register(database, student_id, course_code):
+        database.execute("INSERT OR IGNORE INTO REGISTRATION (student_id, course_code) VALUES (?, ?)", (student_id, course_code))
+
+    results = []
+    try:
+        for mode in ("commit per write", "group commit"):
+            writer = app.start_group_commit() if mode == "group commit" else None
+            counts = []
+            deadline = time.perf_counter() + duration
+
+            def write_loop(seed):
+                rng = random.Random(seed)
+                done = 0
+                while time.perf_counter() < deadline:
+                    app.pool.run(app.write, register, rng.randrange(1, students + 1), rng.choice(crns))
+                    done += 1
+                counts.append(done)
+
+            threads = [threading.Thread(target=write_loop, args=(i,)) for i in range(writers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            app.stop_group_commit()
+            writes = sum(counts)
+            commits = writer.commits if writer else writes
+            results.append({
+                "mode": mode,
+                "writes_per_second": writes / duration,
+                "writes_per_commit": writes / commits if commits else 0.0,
+            })
+    finally:
+        app.pool.close()
+        app.pool = original_pool
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return results
+
+# Function to size the cost of each password scheme to a target hashing time on
+# this machine, then time a burst of concurrent logins verified on `workers`
+# hashing threads with those settings
+def benchmark_password_hashing(target=0.1, logins=16, workers=2, samples=3):
+    results = []
+    for scheme in SCHEMES:
+        hasher, trials = calibrate(target, scheme, samples)
+        hasher.workers = workers
+        hasher.cache_size = 0  # Every login in the burst pays the full cost
+        stored = hasher.hash("password")
+        latencies = []
+
+        def login():
+            started = time.perf_counter()
+            hasher.verify_in_pool("password", stored)
+            latencies.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=login) for _ in range(logins)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        hasher.shutdown()
+        results.append({
+            "scheme": scheme,
+            "parameters": hasher.parameters(),
+            "trials": [{"parameters": parameters, "ms": seconds * 1000} for parameters, seconds in trials],
+            "burst_p50_ms": percentile(latencies, 50) * 1000,
+            "burst_p95_ms": percentile(latencies, 95) * 1000,
+            "logins_per_second": logins / elapsed,
+        })
+    return results
+
+# Function to return the p-th percentile (0-100) of a list of samples, nearest-rank method
+def percentile(samples, p):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+# Function to run an operation repeatedly and summarise its latency and throughput.
+# The operation is called with the iteration number.
+def measure(operation, iterations):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        began = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    return {
+        "iterations": iterations,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": sum(latencies) / iterations * 1000,
+        "ops_per_second": iterations / elapsed if elapsed else 0.0,
+    }
+
+# Function to build the operation for every public Student, Instructor and Admin
+# method against the database the application pool currently points at
+def method_operations(iterations, seed=0):
+    rng = random.Random(seed)
+    with app.pool.connection() as database:
+        students = [row[0] for row in database.execute("SELECT username FROM USER WHERE role = 'student'")]
+        crns = [row[0] for row in database.execute("SELECT CRN FROM COURSE")]
+        registered = set(database.execute("SELECT u.username, r.course_code FROM REGISTRATION r JOIN USER u ON u.ID = r.student_id"))
+        busiest = database.execute("SELECT instructor_id FROM COURSE GROUP BY instructor_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+        instructor_username, = database.execute("SELECT EMAIL FROM INSTRUCTOR WHERE ID = ?", (busiest,)).fetchone()
+        taught = database.execute("SELECT CRN, TITLE, TIME FROM COURSE WHERE instructor_id = ?", (busiest,)).fetchall()
+        next_user_id = database.execute("SELECT MAX(ID) FROM USER").fetchone()[0] + 1
+
+    # Objects are built up front; each session's first authenticate() upgrades its
+    # generated SHA-256 hash and later ones are answered by the session store
+    sessions = [app.Student(username, "password") for username in rng.sample(students, min(len(students), 100))]
+    instructor = app.Instructor(instructor_username, "password")
+    for crn, title, meeting in taught:
+        instructor.assign_course(app.Course(crn, title, instructor_username, meeting))
+    admin = app.Admin("admin", "password")
+
+    # Distinct (student, course) pairs that are not registered yet
+    new_registrations = []
+    while len(new_registrations) < iterations:
+        pair = (rng.choice(students), rng.choice(crns))
+        if pair not in registered:
+            registered.add(pair)
+            new_registrations.append(pair)
+    registering = {username: app.Student(username, "password") for username, _ in new_registrations}
+    terms = [rng.choice(SUBJECTS) for _ in range(iterations)]
+    roster_crns = [rng.choice(crns) for _ in range(iterations)]
+
+    return [
+        ("authenticate", lambda i: sessions[i % len(sessions)].authenticate()),
+        ("register_for_classes", lambda i: sessions[i % len(sessions)].register_for_classes()),
+        ("add_course_to_schedule", lambda i: registering[new_registrations[i][0]].add_course_to_schedule(new_registrations[i][1])),
+        ("see_schedule", lambda i: sessions[i % len(sessions)].see_schedule()),
+        ("view_registered_students", lambda i: instructor.view_registered_students()),
+        ("view_all_courses", lambda i: admin.view_all_courses()),
+        ("view_roster", lambda i: admin.view_roster(roster_crns[i])),
+        ("add_user", lambda i: admin.add_user(next_user_id + i, f"benchuser{next_user_id + i}", "password", "student", "Bench", "User", "2026", "BSCO", "bench@example.com")),
+        ("search_courses", lambda i: app.search_courses("title", terms[i])),
+    ]
+
+# Function to time every public method against generated databases of each size.
+# sizes is a list of (students, sections) pairs.
+def benchmark_methods(sizes, iterations=200, seed=0):
+    results = []
+    original_pool = app.pool
+    for students, sections in sizes:
+        handle, path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        create_campus_database(path, students=students, instructors=max(sections // 4, 1), sections=sections, seed=seed)
+        app.pool = ConnectionPool(path)
+        try:
+            for name, operation in method_operations(iterations, seed):
+                result = measure(operation, iterations)
+                result.update({"method": name, "students": students, "sections": sections})
+                results.append(result)
+        finally:
+            app.pool.close()
+            app.pool = original_pool
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    return results
+
+# Function to time course searches of each field against a large catalog
+def benchmark_search(sections=100000, iterations=200, seed=0):
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    create_campus_database(path, students=1000, instructors=max(sections // 50, 1), sections=sections, seed=seed)
+    rng = random.Random(seed)
+    searches = [
+        ("title", lambda: rng.choice(SUBJECTS)[:4]),
+        ("title", lambda: f"{rng.choice(SUBJECTS)} {rng.randint(1, 4)}"),
+        ("instructor", lambda: rng.choice(FIRST_NAMES)),
+        ("schedule", lambda: f"{rng.choice(['MWF', 'TR', 'MW'])} {rng.randint(8, 11)}:00"),
+        ("department", lambda: "BSCO"),
+        ("crn", lambda: str(10001 + rng.randrange(sections))),
+    ]
+    results = []
+    database = sql.connect(path)
+    try:
+        for field, make_value in searches:
+            values = [make_value() for _ in range(iterations)]
+            result = measure(lambda i: find_courses(database, field, values[i]), iterations)
+            result.update({"field": field, "example": values[0], "sections": sections})
+            results.append(result)
+    finally:
+        database.close()
+        os.remove(path)
+    return results
+
+# Function to describe the code and environment a run was made on
+def run_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sql.sqlite_version,
+        "machine": platform.machine(),
+    }
+
+# Function to save benchmark results as JSON for comparing runs across commits
+def save_results(path, results):
+    with open(path, "w") as output:
+        json.dump({"metadata": run_metadata(), "results": results}, output, indent=2)
+
+# Function to print the change in latency between two saved runs
+def compare_results(old_path, new_path):
+    with open(old_path) as old_file, open(new_path) as new_file:
+        old = json.load(old_file)
+        new = json.load(new_file)
+    before = {(r["method"], r["students"], r["sections"]): r for r in old["results"]}
+    print(f"{old['metadata']['commit']} -> {new['metadata']['commit']}")
+    print(f"{'method':<26}{'size':>14}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}")
+    for result in new["results"]:
+        key = (result["method"], result["students"], result["sections"])
+        if key not in before:
+            continue
+        cells = []
+        for field in ("p50_ms", "p95_ms", "p99_ms"):
+            old_value, new_value = before[key][field], result[field]
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            cells.append(f"{new_value:>9.3f} ({change:+.0f}%)")
+        print(f"{result['method']:<26}{result['students']:>8}/{result['sections']:<5}" + "".join(f"{cell:>18}" for cell in cells))
+
+# Function to parse sizes such as "1000x100,10000x1000" into (students, sections) pairs
+def parse_sizes(text):
+    return [tuple(int(part) for part in size.split("x")) for size in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="LeopardWeb database benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    storage = commands.add_parser("storage", help="concurrent read/write throughput before and after the storage profile")
+    storage.add_argument("--readers", type=int, default=4)
+    storage.add_argument("--writers", type=int, default=2)
+    storage.add_argument("--duration", type=float, default=2.0)
+
+    methods = commands.add_parser("methods", help="latency of every public method on databases of increasing size")
+    methods.add_argument("--sizes", type=parse_sizes, default=parse_sizes("1000x100,10000x1000,50000x5000"),
+                         help="comma separated STUDENTSxSECTIONS")
+    methods.add_argument("--iterations", type=int, default=200)
+    methods.add_argument("--seed", type=int, default=0)
+    methods.add_argument("--output", help="write the results to this JSON file")
+
+    group = commands.add_parser("group-commit", help="registration write throughput with and without group commit")
+    group.add_argument("--writers", type=int, default=8)
+    group.add_argument("--duration", type=float, default=2.0)
+
+    search = commands.add_parser("search", help="latency of full-text course search on a large catalog")
+    search.add_argument("--sections", type=int, default=100000)
+    search.add_argument("--iterations", type=int, default=200)
+    search.add_argument("--seed", type=int, default=0)
+
+    passwords = commands.add_parser("passwords", help="password hashing cost for a target login latency")
+    passwords.add_argument("--target-ms", type=float, default=100.0)
+    passwords.add_argument("--logins", type=int, default=16)
+    passwords.add_argument("--workers", type=int, default=2)
+
+    compare = commands.add_parser("compare", help="compare two JSON result files")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    args = parser.parse_args()
+
+    if args.command == "storage":
+        print(f"{'profile':<18}{'journal':<10}{'reads/s':>12}{'writes/s':>12}{'busy':>8}")
+        for result in compare_storage_profiles(args.readers, args.writers, args.duration):
+            print(f"{result['profile']:<18}{result['journal_mode']:<10}{result['reads_per_second']:>12.0f}"
+                  f"{result['writes_per_second']:>12.0f}{result['busy_errors']:>8}")
+    elif args.command == "methods":
+        results = benchmark_methods(args.sizes, args.iterations, args.seed)
+        print(f"{'method':<26}{'size':>14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}")
+        for result in results:
+            print(f"{result['method']:<26}{result['students']:>8}/{result['sections']:<5}{result['p50_ms']:>10.3f}"
+                  f"{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['ops_per_second']:>12.0f}")
+        if args.output:
+            save_results(args.output, results)
+            print(f"Results saved to {args.output}")
+    elif args.command == "group-commit":
+        print(f"{'mode':<20}{'writes/s':>12}{'writes/commit':>16}")
+        for result in benchmark_group_commit(args.writers, args.duration):
+            print(f"{result['mode']:<20}{result['writes_per_second']:>12.0f}{result['writes_per_commit']:>16.1f}")
+    elif args.command == "search":
+        print(f"{'field':<12}{'example':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for result in benchmark_search(args.sections, args.iterations, args.seed):
+            print(f"{result['field']:<12}{result['example']:<26}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+    elif args.command == "passwords":
+        for result in benchmark_password_hashing(args.target_ms / 1000, args.logins, args.workers):
+            print(f"{result['scheme']}")
+            for trial in result["trials"]:
+                print(f"  {trial['parameters']:<24}{trial['ms']:>10.1f} ms")
+            print(f"  chosen {result['parameters']}: {args.logins} concurrent logins on {args.workers} workers, "
+                  f"p50 {result['burst_p50_ms']:.1f} ms, p95 {result['burst_p95_ms']:.1f} ms, {result['logins_per_second']:.1f} logins/s")
+    else:
+        compare_results(args.old, args.new)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import bisect
+import threading
+
+# Function to format a course row (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS) for listing
+def format_course(row):
+    return f"{row[0]}: {row[1]}, {row[2]}, {row[3]}, {row[4]}, {row[5]}, {row[6]}, {row[7]} credits"
+
+# Define the CourseCatalog class
+# Process-wide cache of the formatted course listing. It is loaded from the
+# database once and then kept current by add and remove, which the admin
+# methods call after committing, so listing the catalog costs no queries and
+# no formatting. Every change bumps `version`. Code that writes COURSE some
+# other way (scripts, bulk loads) must call invalidate().
+class CourseCatalog:
+    def __init__(self):
+        self.version = 0
+        self._pool = None
+        self._lines = None  # CRN -> formatted line
+        self._listing = None  # Lines in CRN order, rebuilt only after a change
+        self._crns = None  # Sorted CRNs matching _listing, for keyset paging
+        self._lock = threading.Lock()
+
+    # Load the catalog through the pool if needed; the caller holds the lock.
+    # A different pool (another database) always reloads.
+    def _current(self, pool):
+        if self._lines is None or self._pool is not pool:
+            with pool.connection() as database:
+                cursor = database.execute("SELECT CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS FROM COURSE ORDER BY CRN")
+                self._lines = {row[0]: format_course(row) for row in cursor}
+            self._pool = pool
+            self._listing = None
+        if self._listing is None:
+            self._crns = sorted(self._lines)
+            self._listing = [self._lines[crn] for crn in self._crns]
+        return self._listing
+
+    # Return the whole formatted catalog
+    def listing(self, pool):
+        with self._lock:
+            return list(self._current(pool))
+
+    # Return up to `size` lines for the courses after CRN `after` (from the
+    # start when None), and the CRN to pass as `after` for the next page, or
+    # None when this is the last page
+    def page(self, pool, after=None, size=50):
+        with self._lock:
+            listing = self._current(pool)
+            start = 0 if after is None else bisect.bisect_right(self._crns, after)
+            end = start + size
+            return listing[start:end], (self._crns[end - 1] if end < len(listing) else None)
+
+    # Add or replace one course after it has been written to the database
+    def add(self, row):
+        with self._lock:
+            self.version += 1
+            if self._lines is not None:
+                self._lines[row[0]] = format_course(row)
+                self._listing = None
+
+    # Drop one course after it has been deleted from the database
+    def remove(self, course_code):
+        with self._lock:
+            self.version += 1
+            if self._lines is not None:
+                self._lines.pop(course_code, None)
+                self._listing = None
+
+    # Forget everything; the next listing reloads from the database
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._lines = None
+            self._listing = None
+            self._crns = None
@@ -0,0 +1,140 @@
+import argparse
+import hashlib
+import random
+import time
+
+from LeopardWebPool import connect
+from LeopardWebSchedule import meeting_mask
+from LeopardWebSchema import migrate
+from LeopardWebSeed import bulk_load
+
+# Department codes used by the sample data, extended with DEPT<n> when more are asked for
+DEPARTMENTS = ["BSCO", "BSEE", "BSAS", "BCOS", "BSCH", "HUSS", "Math", "English", "Humanities", "Physics", "Electronics"]
+
+FIRST_NAMES = ["Ada", "Alan", "Albert", "Grace", "Isaac", "Katherine", "Marie", "Mark", "Mae", "Nikola",
+               "Linus", "Tim", "Margaret", "Michael", "John", "Vera", "Enrico", "Niels", "Paul", "Irene"]
+SURNAMES = ["Lovelace", "Turing", "Einstein", "Hopper", "Newton", "Johnson", "Curie", "Dean", "Jemison", "Tesla",
+            "Torvalds", "Berners-Lee", "Hamilton", "Faraday", "von Neumann", "Rubin", "Fermi", "Bohr", "Dirac", "Planck"]
+TITLES = ["Full Prof.", "Associate Prof.", "Assistant Prof."]
+SUBJECTS = ["Calculus", "Circuit Design", "Programming Concepts", "Networks", "Statistics", "Literature",
+            "Digital Systems", "Thermodynamics", "Signals", "Databases", "Writing", "Music"]
+
+# Meeting patterns in the DAYS/TIME formats stored in COURSE: day letters
+# (M T W R F) with the start times and length in minutes of each block
+MEETING_PATTERNS = [
+    ("MWF", ["8:00", "9:00", "10:00", "11:00", "12:00", "1:00", "2:00", "3:00", "4:00"], 50),
+    ("TR", ["8:00", "9:30", "11:00", "12:30", "2:00", "3:30"], 75),
+    ("MW", ["8:00", "9:30", "11:00", "1:00", "2:30"], 80),
+    ("W", ["2:00"], 110),
+    ("F", ["9:00", "1:00"], 110),
+]
+
+# Function to format a start time and length as COURSE.TIME, e.g. '12:00-1:50'
+def meeting_time(start, minutes):
+    hour, minute = (int(part) for part in start.split(":"))
+    end = hour * 60 + minute + minutes
+    end_hour = (end // 60 - 1) % 12 + 1
+    return f"{start}-{end_hour}:{end % 60:02d}"
+
+# Function to generate a deterministic campus. The result is a dict of record
+# lists in the order bulk_load expects, so it can be passed straight to it.
+# USER, STUDENT and INSTRUCTOR share IDs so the roster joins line up.
+def generate_campus(students=1000, instructors=50, departments=10, sections=200, registrations_per_student=4,
+                    capacity=60, meeting_patterns=MEETING_PATTERNS, semester="Fall", year=2024, seed=0, password="password"):
+    rng = random.Random(seed)
+    password_hash = hashlib.sha256(password.encode()).hexdigest()
+    department_codes = (DEPARTMENTS + [f"DEPT{i}" for i in range(len(DEPARTMENTS) + 1, departments + 1)])[:departments]
+
+    users = []
+    student_records = []
+    student_majors = []
+    for i in range(1, students + 1):
+        username = f"student{i}"
+        major = rng.choice(department_codes)
+        users.append((i, username, password_hash, "student"))
+        student_records.append((i, rng.choice(FIRST_NAMES), rng.choice(SURNAMES), username, str(year + rng.randint(1, 4)), major, username))
+        student_majors.append(major)
+
+    instructor_records = []
+    instructor_departments = {code: [] for code in department_codes}
+    for i in range(1, instructors + 1):
+        username = f"instructor{i}"
+        department = department_codes[(i - 1) % len(department_codes)]
+        users.append((students + i, username, password_hash, "instructor"))
+        instructor_records.append((i, rng.choice(FIRST_NAMES), rng.choice(SURNAMES), rng.choice(TITLES), rng.randint(1980, year), department, username))
+        instructor_departments[department].append(i)
+
+    users.append((students + instructors + 1, "admin", password_hash, "admin"))
+    admin_records = [(1, "Vera", "Rubin", "Vice-President", "Wentworth 101", "admin")]
+
+    course_records = []
+    department_sections = {code: [] for code in department_codes}
+    for i in range(sections):
+        crn = 10001 + i
+        department = department_codes[i % len(department_codes)]
+        days, starts, minutes = rng.choice(meeting_patterns)
+        teachers = instructor_departments[department] or [rng.randint(1, max(instructors, 1))]
+        instructor_id = rng.choice(teachers) if instructors else None
+        title = f"{rng.choice(SUBJECTS)} {rng.randint(1, 4)}"
+        course_records.append((crn, title, department, meeting_time(rng.choice(starts), minutes), days, semester, year, rng.choice([3, 3, 4, 4, 1]), instructor_id, capacity))
+        department_sections[department].append(crn)
+
+    # Each student takes about registrations_per_student sections, mostly from
+    # their major, skipping sections that are already at capacity or that meet
+    # at the same time as one already chosen (every section is in one term)
+    all_sections = [record[0] for record in course_records]
+    seats_left = {crn: capacity for crn in all_sections}
+    masks = {record[0]: meeting_mask(record[4], record[3]) for record in course_records}
+    registrations = []
+    for student_id, major in enumerate(student_majors, start=1):
+        wanted = min(max(0, round(rng.gauss(registrations_per_student, 1))), len(all_sections))
+        chosen = set()
+        busy = 0
+        major_sections = department_sections.get(major) or all_sections
+        attempts = 0
+        while len(chosen) < wanted and attempts < wanted * 20:
+            attempts += 1
+            candidates = major_sections if rng.random() < 0.7 else all_sections
+            crn = rng.choice(candidates)
+            if seats_left[crn] > 0 and crn not in chosen and not masks[crn] & busy:
+                seats_left[crn] -= 1
+                chosen.add(crn)
+                busy |= masks[crn]
+        registrations.extend((student_id, crn) for crn in sorted(chosen))
+
+    return {
+        "users": users,
+        "students": student_records,
+        "instructors": instructor_records,
+        "admins": admin_records,
+        "courses": course_records,
+        "registrations": registrations,
+    }
+
+# Function to migrate a database and fill it with a generated campus; returns row counts
+def populate_database(database, **parameters):
+    migrate(database)
+    return bulk_load(database, **generate_campus(**parameters))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic LeopardWeb campus database")
+    parser.add_argument("output", help="database file to create or add to")
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--instructors", type=int, default=1500)
+    parser.add_argument("--departments", type=int, default=25)
+    parser.add_argument("--sections", type=int, default=5000)
+    parser.add_argument("--registrations-per-student", type=int, default=4)
+    parser.add_argument("--capacity", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    database = connect(args.output)
+    start = time.perf_counter()
+    counts = populate_database(database, students=args.students, instructors=args.instructors,
+                               departments=args.departments, sections=args.sections,
+                               registrations_per_student=args.registrations_per_student, capacity=args.capacity, seed=args.seed)
+    database.close()
+    print(f"Generated {counts} in {time.perf_counter() - start:.2f} seconds.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import threading
+from collections import OrderedDict
+
+from LeopardWebSearch import match_expression
+
+# Define the Listing class
+# A sorted, filtered query that is read one page at a time, for views that only
+# ever show a screenful of a long result. Sorting and filtering happen in SQL,
+# on whitelisted column expressions only. A page that follows one already read
+# is found with a keyset seek from where that page ended; OFFSET is only used
+# when jumping ahead. The most recent pages are kept, so scrolling back and
+# forth does not query again. Subclasses set COLUMNS, KEY and the query parts.
+class Listing:
+    COLUMNS = {}  # Column name -> SQL expression, in display order
+    KEY = None  # Unique expression that breaks ties in the sort order
+    page_size = 100
+    cached_pages = 20
+
+    def __init__(self, pool, sort, descending, source, where, parameters):
+        if sort not in self.COLUMNS:
+            raise ValueError(f"Cannot sort by {sort}.")
+        self.pool = pool
+        self.sort = sort
+        self.descending = descending
+        self._source = source
+        self._where = " AND ".join(where) or "1"
+        self._parameters = tuple(parameters)
+        self._count = None
+        self._pages = OrderedDict()
+        self._ends = {}  # Page number -> (sort value, key) of its last row
+        self._lock = threading.Lock()
+
+    @property
+    def columns(self):
+        return list(self.COLUMNS)
+
+    # Number of rows matching the filter
+    def count(self):
+        if self._count is None:
+            with self.pool.connection() as database:
+                self._count = database.execute(f"SELECT COUNT(*) FROM {self._source} WHERE {self._where}", self._parameters).fetchone()[0]
+        return self._count
+
+    # Rows offset to offset + limit of the sorted result, as tuples in COLUMNS order
+    def rows(self, offset, limit):
+        if limit <= 0:
+            return []
+        first = offset // self.page_size
+        last = (offset + limit - 1) // self.page_size
+        rows = []
+        for page in range(first, last + 1):
+            rows.extend(self.page(page))
+        start = offset - first * self.page_size
+        return rows[start:start + limit]
+
+    # The same rows as rows(), but only if every page they span has already been
+    # read; None otherwise. Never queries, so it is safe on the UI thread.
+    def cached_rows(self, offset, limit):
+        first = offset // self.page_size
+        last = max(offset + limit - 1, offset) // self.page_size
+        rows = []
+        with self._lock:
+            for page in range(first, last + 1):
+                if page not in self._pages:
+                    return None
+                rows.extend(self._pages[page])
+        start = offset - first * self.page_size
+        return rows[start:start + limit]
+
+    # One page of page_size rows
+    def page(self, number):
+        with self._lock:
+            if number in self._pages:
+                self._pages.move_to_end(number)
+                return self._pages[number]
+            previous = self._ends.get(number - 1)
+        order = "DESC" if self.descending else "ASC"
+        sort = self.COLUMNS[self.sort]
+        ordering = f" ORDER BY {sort} {order}, {self.KEY} {order}"
+        query = f"SELECT {', '.join(self.COLUMNS.values())}, {sort}, {self.KEY} FROM {self._source} WHERE {self._where}"
+        parameters = list(self._parameters)
+        with self.pool.connection() as database:
+            if number and previous is None:
+                # Jumping ahead: find where the page before ends by skipping rows
+                # of just the sort value and key, which an index on the sort
+                # column covers, then seek from there like any other page
+                previous = database.execute(f"SELECT {sort}, {self.KEY} FROM {self._source} WHERE {self._where}{ordering} LIMIT 1 OFFSET ?",
+                                            parameters + [number * self.page_size - 1]).fetchone()
+                if previous is None:
+                    return []
+            if number:
+                query += f" AND ({sort}, {self.KEY}) {'<' if self.descending else '>'} (?, ?)"
+                parameters.extend(previous)
+            fetched = database.execute(query + ordering + " LIMIT ?", parameters + [self.page_size]).fetchall()
+        rows = [row[:-2] for row in fetched]
+        with self._lock:
+            if fetched:
+                self._ends[number] = fetched[-1][-2:]
+            self._pages[number] = rows
+            while len(self._pages) > self.cached_pages:
+                self._pages.popitem(last=False)
+        return rows
+
+# Define the CourseListing class
+# The course catalog, optionally filtered by a full-text search over every
+# searchable field (see LeopardWebSearch)
+class CourseListing(Listing):
+    COLUMNS = {
+        "crn": "c.CRN",
+        "title": "c.TITLE",
+        "department": "c.DEPARTMENT",
+        "instructor": "COALESCE(i.NAME, '')",
+        "days": "c.DAYS",
+        "time": "c.TIME",
+        "semester": "c.SEMESTER",
+        "credits": "c.CREDITS",
+        "seats": "c.CAPACITY - c.ENROLLED",
+    }
+    KEY = "c.CRN"
+
+    def __init__(self, pool, sort="crn", descending=False, text=""):
+        where, parameters = [], []
+        expression = match_expression(None, text)
+        if expression:
+            where.append("c.CRN IN (SELECT rowid FROM COURSE_SEARCH WHERE COURSE_SEARCH MATCH ?)")
+            parameters.append(expression)
+        super().__init__(pool, sort, descending, "COURSE c LEFT JOIN INSTRUCTOR i ON i.ID = c.instructor_id", where, parameters)
+
+# Define the RosterListing class
+# The students registered for one course, optionally filtered by the start of
+# their first or last name
+class RosterListing(Listing):
+    COLUMNS = {
+        "id": "r.student_id",
+        "name": "s.NAME",
+        "surname": "s.SURNAME",
+        "major": "COALESCE(s.MAJOR, '')",
+        "gradyear": "COALESCE(s.GRADYEAR, '')",
+    }
+    KEY = "r.student_id"
+
+    def __init__(self, pool, course_code, sort="id", descending=False, text=""):
+        where, parameters = ["r.course_code = ?"], [course_code]
+        text = text.strip()
+        if text:
+            pattern = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where.append("(s.NAME LIKE ? ESCAPE '\\' OR s.SURNAME LIKE ? ESCAPE '\\')")
+            parameters.extend([pattern, pattern])
+        super().__init__(pool, sort, descending, "REGISTRATION r JOIN STUDENT s ON s.ID = r.student_id", where, parameters)
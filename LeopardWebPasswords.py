@@ -0,0 +1,180 @@
+import base64
+import hashlib
+import hmac
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Schemes this module can hash with, strongest first
+SCHEMES = ("scrypt", "pbkdf2_sha256") if hasattr(hashlib, "scrypt") else ("pbkdf2_sha256",)
+
+# Function to compute the unsalted SHA-256 hex digest earlier versions stored
+def legacy_hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# Function to tell a legacy SHA-256 hex digest from a self-describing hash
+def is_legacy_hash(encoded):
+    return len(encoded) == 64 and "$" not in encoded
+
+def encode_bytes(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+def decode_bytes(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+# Define the PasswordHasher class
+# Salted, memory-hard password hashing. Every hash is stored with its scheme and
+# cost so USER.password describes itself:
+#     scrypt$n=16384,r=8,p=1$<salt>$<hash>
+#     pbkdf2_sha256$i=600000$<salt>$<hash>
+# verify() accepts any of these and legacy SHA-256 hex digests, and needs_rehash()
+# reports when a stored hash is not made with the current settings, so raising
+# the cost only needs new settings: each user is upgraded at their next login.
+# The *_in_pool methods run on a small pool of worker threads (hashlib releases
+# the GIL while it works), so a burst of logins queues behind `workers` hashes
+# instead of taking every core. Successful verifications are remembered in an
+# LRU keyed by an HMAC under a per-process key, so re-authenticating a session
+# does not pay the cost again and no password is kept in memory. The key covers
+# the stored hash, whose salt changes with every new password, so a changed
+# password can never match an old entry.
+class PasswordHasher:
+    def __init__(self, scheme=SCHEMES[0], n=2 ** 14, r=8, p=1, iterations=600000, salt_bytes=16, workers=2, cache_size=1024):
+        if scheme not in SCHEMES:
+            raise ValueError(f"Unsupported password scheme {scheme}.")
+        self.scheme = scheme
+        self.n = n
+        self.r = r
+        self.p = p
+        self.iterations = iterations
+        self.salt_bytes = salt_bytes
+        self.workers = workers
+        self.cache_size = cache_size
+        self._executor = None
+        self._dummy = None
+        self._cache = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._lock = threading.Lock()
+
+    # The cost parameters of the current settings, as written into a hash
+    def parameters(self):
+        if self.scheme == "scrypt":
+            return f"n={self.n},r={self.r},p={self.p}"
+        return f"i={self.iterations}"
+
+    # Hash a password with a fresh salt
+    def hash(self, password, salt=None):
+        salt = salt or os.urandom(self.salt_bytes)
+        parameters = self.parameters()
+        derived = derive(self.scheme, parse_parameters(parameters), password, salt)
+        return f"{self.scheme}${parameters}${encode_bytes(salt)}${encode_bytes(derived)}"
+
+    # Check a password against a stored hash in constant time. A missing hash
+    # (no such user) still costs one hash, so it takes as long as a wrong password.
+    def verify(self, password, encoded):
+        if not encoded:
+            if self._dummy is None:
+                self._dummy = self.hash("")
+            self._check(password, self._dummy)
+            return False
+        key = hmac.new(self._cache_key, encoded.encode() + b"\0" + password.encode(), "sha256").digest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return True
+        if not self._check(password, encoded):
+            return False
+        with self._lock:
+            self._cache[key] = True
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return True
+
+    # True if a stored hash should be replaced by one made with the current settings
+    def needs_rehash(self, encoded):
+        if is_legacy_hash(encoded):
+            return True
+        try:
+            scheme, parameters, _, _ = encoded.split("$")
+            return scheme != self.scheme or parse_parameters(parameters) != parse_parameters(self.parameters())
+        except ValueError:
+            return True
+
+    def hash_in_pool(self, password):
+        return self._pool().submit(self.hash, password).result()
+
+    def verify_in_pool(self, password, encoded):
+        return self._pool().submit(self.verify, password, encoded).result()
+
+    # Stop the worker threads; they are started again on the next *_in_pool call
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="LeopardWebHash")
+            return self._executor
+
+    def _check(self, password, encoded):
+        if is_legacy_hash(encoded):
+            return hmac.compare_digest(legacy_hash(password), encoded)
+        try:
+            scheme, parameters, salt, expected = encoded.split("$")
+            derived = derive(scheme, parse_parameters(parameters), password, decode_bytes(salt))
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived, decode_bytes(expected))
+
+# Function to parse "n=16384,r=8,p=1" into {"n": 16384, "r": 8, "p": 1}
+def parse_parameters(text):
+    return {name: int(value) for name, value in (part.split("=") for part in text.split(","))}
+
+# Function to derive the key for one scheme and cost
+def derive(scheme, parameters, password, salt):
+    if scheme == "scrypt" and "scrypt" in SCHEMES:
+        n, r, p = parameters["n"], parameters["r"], parameters["p"]
+        # scrypt needs about 128 * r * (n + p) bytes; OpenSSL refuses over 32 MB unless told
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * r * (n + p) + 2 ** 20, dklen=32)
+    if scheme == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, parameters["i"], dklen=32)
+    raise ValueError(f"Unsupported password scheme {scheme}.")
+
+# Function to find the highest cost whose median hashing time on this machine
+# stays within target seconds. Returns (hasher, [(parameters, seconds), ...]).
+# scrypt doubles n from 2**10; PBKDF2 measures a small run and scales linearly.
+def calibrate(target=0.1, scheme=SCHEMES[0], samples=3, r=8, p=1):
+    def timed(hasher):
+        times = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            hasher.hash("calibration")
+            times.append(time.perf_counter() - started)
+        return statistics.median(times)
+
+    trials = []
+    if scheme == "scrypt":
+        best = PasswordHasher(scheme, n=2 ** 10, r=r, p=p)
+        n = 2 ** 10
+        while n <= 2 ** 20:
+            hasher = PasswordHasher(scheme, n=n, r=r, p=p)
+            seconds = timed(hasher)
+            trials.append((hasher.parameters(), seconds))
+            if seconds > target:
+                break
+            best = hasher
+            n *= 2
+        return best, trials
+
+    probe = PasswordHasher(scheme, iterations=20000)
+    seconds = timed(probe)
+    trials.append((probe.parameters(), seconds))
+    iterations = max(int(20000 * target / seconds) // 1000 * 1000, 1000)
+    best = PasswordHasher(scheme, iterations=iterations)
+    trials.append((best.parameters(), timed(best)))
+    return best, trials
@@ -0,0 +1,171 @@
+import sqlite3 as sql
+import threading
+import queue
+import random
+import time
+from contextlib import contextmanager
+
+# Raised when no connection can be checked out of the pool in time
+class PoolTimeout(Exception):
+    pass
+
+# Define the StorageProfile class
+# Pragmas applied to every new connection, plus the policy used to retry a
+# write when another connection holds the database lock.
+class StorageProfile:
+    def __init__(self, journal_mode="WAL", synchronous="NORMAL", cache_size=-16000, mmap_size=268435456,
+                 busy_timeout=5000, busy_retries=5, busy_backoff=0.02, busy_backoff_max=1.0):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size  # Negative values are KiB, positive values are pages
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout  # Milliseconds SQLite itself waits on a lock
+        self.busy_retries = busy_retries
+        self.busy_backoff = busy_backoff  # Seconds before the first retry, doubled after each one
+        self.busy_backoff_max = busy_backoff_max
+
+    # Apply the pragmas to an open connection
+    def apply(self, connection):
+        connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        connection.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        connection.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+
+    # Seconds to sleep before the given retry, with jitter so writers spread out
+    def backoff(self, attempt):
+        delay = min(self.busy_backoff * (2 ** attempt), self.busy_backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+# Profile used by the application: WAL so readers never block the writer
+DEFAULT_PROFILE = StorageProfile()
+
+# SQLite's own defaults, kept for comparison in the benchmark
+LEGACY_PROFILE = StorageProfile(journal_mode="DELETE", synchronous="FULL", cache_size=-2000, mmap_size=0,
+                                busy_timeout=5000, busy_retries=0)
+
+# Function to check whether an error means the database was locked by another connection
+def is_busy_error(error):
+    message = str(error).lower()
+    return isinstance(error, sql.OperationalError) and ("locked" in message or "busy" in message)
+
+# Function to open a single connection with a storage profile applied
+def connect(path, profile=DEFAULT_PROFILE, **kwargs):
+    connection = sql.connect(path, timeout=profile.busy_timeout / 1000, **kwargs)
+    profile.apply(connection)
+    return connection
+
+# Define the ConnectionPool class
+# Hands out at most `size` sqlite connections. Each thread checks out one
+# connection for the duration of a `with pool.connection()` block; nested
+# blocks on the same thread reuse that connection instead of taking another.
+class ConnectionPool:
+    def __init__(self, path, size=5, timeout=30.0, profile=DEFAULT_PROFILE):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.profile = profile
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # Open a new connection that may be handed between worker threads
+    def _connect(self):
+        return connect(self.path, self.profile, check_same_thread=False)
+
+    # Check a connection out of the pool, opening a new one while under the size limit
+    def acquire(self, timeout=None):
+        if self._closed:
+            raise sql.ProgrammingError("Connection pool is closed.")
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No database connection available after {timeout} seconds.")
+
+    # Return a connection to the pool, discarding any unfinished transaction
+    def release(self, connection):
+        if connection.in_transaction:
+            connection.rollback()
+        if self._closed:
+            connection.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(connection)
+
+    # Context manager used by the data-access methods. Commits on a clean exit
+    # of the outermost block and rolls back if an exception escapes it.
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "connection", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        connection = self.acquire()
+        self._local.connection = connection
+        self._local.depth = 1
+        try:
+            yield connection
+            if connection.in_transaction:
+                connection.commit()
+        except BaseException:
+            if connection.in_transaction:
+                connection.rollback()
+            raise
+        finally:
+            self._local.connection = None
+            self._local.depth = 0
+            self.release(connection)
+
+    # Call a data-access function, retrying with backoff while the database is busy.
+    # Only the outermost call retries; a nested call shares its caller's transaction.
+    def run(self, function, *args, **kwargs):
+        if getattr(self._local, "connection", None) is not None:
+            return function(*args, **kwargs)
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except sql.OperationalError as error:
+                if not is_busy_error(error) or attempt >= self.profile.busy_retries:
+                    raise
+                time.sleep(self.profile.backoff(attempt))
+                attempt += 1
+
+    # Close every idle connection; connections still checked out close on release
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+            with self._lock:
+                self._created -= 1
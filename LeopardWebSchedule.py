@@ -0,0 +1,80 @@
+import re
+
+# A week is cut into 5 minute slots, one bit each, Monday 0:00 first. A course's
+# meetings become one integer, so two courses clash exactly when their masks AND
+# to something non-zero.
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_LETTERS = "MTWRFSU"
+MASK_BYTES = SLOTS_PER_DAY * len(DAY_LETTERS) // 8
+
+TIME_PATTERN = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*([ap]m)?\s*-\s*(\d{1,2}):(\d{2})\s*([ap]m)?\s*$", re.IGNORECASE)
+
+# Function to convert one clock reading to minutes after midnight. TIME values
+# have no AM/PM, so hours 1-6 are read as afternoon classes.
+def clock_minutes(hour, minute, suffix=None):
+    if suffix:
+        hour = hour % 12 + (12 if suffix.lower() == "pm" else 0)
+    elif 1 <= hour <= 6:
+        hour += 12
+    return hour * 60 + minute
+
+# Function to parse COURSE.TIME such as '12:00-1:50' into (start, end) minutes
+# after midnight. Returns None if the text is not a time range.
+def parse_time(text):
+    match = TIME_PATTERN.match(text or "")
+    if not match:
+        return None
+    start_hour, start_minute, start_suffix, end_hour, end_minute, end_suffix = match.groups()
+    start = clock_minutes(int(start_hour), int(start_minute), start_suffix)
+    end = clock_minutes(int(end_hour), int(end_minute), end_suffix)
+    if end <= start and not end_suffix:
+        end += 12 * 60
+    if not 0 <= start < end <= 24 * 60:
+        return None
+    return start, end
+
+# Function to parse COURSE.DAYS such as 'MWF' or 'TR' into day numbers (Monday is 0).
+# Returns None if any letter is not a day.
+def parse_days(text):
+    letters = (text or "").upper().replace("TH", "R").replace(" ", "")
+    if not letters or any(letter not in DAY_LETTERS for letter in letters):
+        return None
+    return sorted({DAY_LETTERS.index(letter) for letter in letters})
+
+# Function to build the weekly occupancy mask of a course. Courses whose
+# DAYS or TIME cannot be parsed get 0, so they never conflict with anything.
+def meeting_mask(days, time):
+    day_numbers = parse_days(days)
+    span = parse_time(time)
+    if day_numbers is None or span is None:
+        return 0
+    first = span[0] // SLOT_MINUTES
+    last = -(-span[1] // SLOT_MINUTES)
+    day_bits = ((1 << (last - first)) - 1) << first
+    mask = 0
+    for day in day_numbers:
+        mask |= day_bits << (day * SLOTS_PER_DAY)
+    return mask
+
+# Function to store a mask in COURSE.MEETING_MASK (a BLOB, as it is wider than an INTEGER)
+def encode_mask(mask):
+    return mask.to_bytes(MASK_BYTES, "little") if mask else None
+
+# Function to read COURSE.MEETING_MASK back into an integer
+def decode_mask(blob):
+    return int.from_bytes(blob, "little") if blob else 0
+
+# Function to split a schedule typed as 'MWF 8:00-8:50' into (DAYS, TIME).
+# Text without a leading day pattern is kept as the TIME with DAYS 'N/A'.
+def split_schedule(schedule):
+    parts = (schedule or "").split(None, 1)
+    if len(parts) == 2 and parse_days(parts[0]) is not None:
+        return parts[0].upper(), parts[1].strip()
+    return "N/A", schedule
+
+# Migration step that computes the mask of every course already in the database
+def backfill_meeting_masks(database):
+    rows = database.execute("SELECT CRN, DAYS, TIME FROM COURSE").fetchall()
+    database.executemany("UPDATE COURSE SET MEETING_MASK = ? WHERE CRN = ?",
+                         [(encode_mask(meeting_mask(days, time)), crn) for crn, days, time in rows])
@@ -0,0 +1,230 @@
+import sqlite3 as sql
+
+from LeopardWebSchedule import backfill_meeting_masks
+
+# Tables of the LeopardWeb database as first shipped. IF NOT EXISTS lets an
+# existing database created by the old initialize_database adopt version 1
+# without its data being touched.
+BASE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS USER (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS STUDENT (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        NAME TEXT NOT NULL,
+        SURNAME TEXT NOT NULL,
+        USERNAME TEXT NOT NULL UNIQUE,
+        GRADYEAR TEXT,
+        MAJOR TEXT,
+        EMAIL TEXT,
+        FOREIGN KEY (USERNAME) REFERENCES USER(username)
+    )""",
+    """CREATE TABLE IF NOT EXISTS INSTRUCTOR (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        NAME TEXT NOT NULL,
+        SURNAME TEXT NOT NULL,
+        TITLE TEXT,
+        HIREYEAR INTEGER,
+        DEPT TEXT,
+        EMAIL TEXT NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE IF NOT EXISTS ADMIN (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        NAME TEXT NOT NULL,
+        SURNAME TEXT NOT NULL,
+        TITLE TEXT,
+        OFFICE TEXT,
+        EMAIL TEXT NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE IF NOT EXISTS COURSE (
+        CRN INTEGER PRIMARY KEY,
+        TITLE TEXT NOT NULL,
+        DEPARTMENT TEXT NOT NULL,
+        TIME TEXT NOT NULL,
+        DAYS TEXT NOT NULL,
+        SEMESTER TEXT NOT NULL,
+        YEAR INTEGER NOT NULL,
+        CREDITS INTEGER NOT NULL,
+        instructor_id INTEGER,
+        FOREIGN KEY (instructor_id) REFERENCES INSTRUCTOR(ID)
+    )""",
+    """CREATE TABLE IF NOT EXISTS REGISTRATION (
+        student_id INTEGER NOT NULL,
+        course_code INTEGER NOT NULL,
+        PRIMARY KEY (student_id, course_code),
+        FOREIGN KEY (student_id) REFERENCES USER(ID),
+        FOREIGN KEY (course_code) REFERENCES COURSE(CRN)
+    )""",
+]
+
+# Secondary indexes for the hot registration, roster and instructor queries.
+# Lookups of REGISTRATION by student_id are already served by the composite
+# primary key (student_id, course_code), so only the reverse direction needs one.
+INDEXES = [
+    # Roster lookups (view_roster, view_registered_students) filter by course_code
+    # and only need student_id back, so this index covers them without touching the table
+    "CREATE INDEX IF NOT EXISTS idx_registration_course ON REGISTRATION (course_code, student_id)",
+    # Instructor schedule lookups filter COURSE by instructor_id
+    "CREATE INDEX IF NOT EXISTS idx_course_instructor ON COURSE (instructor_id)",
+]
+
+# Seat limits for open registration. ENROLLED is kept equal to the number of
+# REGISTRATION rows for the course by the application, in the same transaction
+# as each insert or delete, so nothing has to COUNT(*) the registrations.
+SEAT_CAPACITY = [
+    "ALTER TABLE COURSE ADD COLUMN CAPACITY INTEGER NOT NULL DEFAULT 30",
+    "ALTER TABLE COURSE ADD COLUMN ENROLLED INTEGER NOT NULL DEFAULT 0",
+    "UPDATE COURSE SET ENROLLED = (SELECT COUNT(*) FROM REGISTRATION WHERE course_code = COURSE.CRN)",
+]
+
+# Queue of students waiting for a seat in a full section. The AUTOINCREMENT ID
+# gives first-come order, and the (course_code, ID) index makes finding the head
+# of a section's queue a single index seek however long the queue grows.
+WAITLIST = [
+    """CREATE TABLE IF NOT EXISTS WAITLIST (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        course_code INTEGER NOT NULL,
+        added_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (student_id, course_code),
+        FOREIGN KEY (student_id) REFERENCES USER(ID),
+        FOREIGN KEY (course_code) REFERENCES COURSE(CRN)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_waitlist_course ON WAITLIST (course_code, ID)",
+]
+
+# Weekly occupancy bitmask of each course (see LeopardWebSchedule), computed
+# once when a course is written so conflict checks never re-parse DAYS and TIME
+MEETING_MASKS = [
+    "ALTER TABLE COURSE ADD COLUMN MEETING_MASK BLOB",
+    backfill_meeting_masks,
+]
+
+# Full-text index behind search_courses. Each row mirrors one course (rowid is
+# the CRN) with the instructor's name and the meeting pattern denormalised in,
+# and triggers keep it in step with COURSE and INSTRUCTOR. Prefix indexes make
+# 'calc*' style queries index lookups, and matches in the title rank highest.
+COURSE_SEARCH_COLUMNS = "title, department, instructor, semester, meeting"
+COURSE_SEARCH_ROW = "{row}.TITLE, {row}.DEPARTMENT, (SELECT NAME || ' ' || SURNAME FROM INSTRUCTOR WHERE ID = {row}.instructor_id), {row}.SEMESTER || ' ' || {row}.YEAR, {row}.DAYS || ' ' || {row}.TIME"
+COURSE_SEARCH = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS COURSE_SEARCH USING fts5({COURSE_SEARCH_COLUMNS}, prefix = '1 2 3 4')",
+    "INSERT INTO COURSE_SEARCH (COURSE_SEARCH, rank) VALUES ('rank', 'bm25(10.0, 2.0, 5.0, 1.0, 1.0)')",
+    f"""CREATE TRIGGER IF NOT EXISTS course_search_insert AFTER INSERT ON COURSE BEGIN
+        INSERT INTO COURSE_SEARCH (rowid, {COURSE_SEARCH_COLUMNS}) VALUES (new.CRN, {COURSE_SEARCH_ROW.format(row="new")});
+    END""",
+    # Only columns that are indexed; ENROLLED changes on every registration and must not rewrite the index
+    f"""CREATE TRIGGER IF NOT EXISTS course_search_update AFTER UPDATE OF CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, instructor_id ON COURSE BEGIN
+        DELETE FROM COURSE_SEARCH WHERE rowid = old.CRN;
+        INSERT INTO COURSE_SEARCH (rowid, {COURSE_SEARCH_COLUMNS}) VALUES (new.CRN, {COURSE_SEARCH_ROW.format(row="new")});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS course_search_delete AFTER DELETE ON COURSE BEGIN
+        DELETE FROM COURSE_SEARCH WHERE rowid = old.CRN;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS course_search_instructor_insert AFTER INSERT ON INSTRUCTOR BEGIN
+        UPDATE COURSE_SEARCH SET instructor = new.NAME || ' ' || new.SURNAME WHERE rowid IN (SELECT CRN FROM COURSE WHERE instructor_id = new.ID);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS course_search_instructor_update AFTER UPDATE OF NAME, SURNAME ON INSTRUCTOR BEGIN
+        UPDATE COURSE_SEARCH SET instructor = new.NAME || ' ' || new.SURNAME WHERE rowid IN (SELECT CRN FROM COURSE WHERE instructor_id = new.ID);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS course_search_instructor_delete AFTER DELETE ON INSTRUCTOR BEGIN
+        UPDATE COURSE_SEARCH SET instructor = NULL WHERE rowid IN (SELECT CRN FROM COURSE WHERE instructor_id = old.ID);
+    END""",
+    lambda database: rebuild_course_search(database),
+]
+
+# Function to re-index every course in one statement, which is far cheaper than
+# the per-row triggers when a whole catalog is loaded at once
+def rebuild_course_search(database):
+    database.execute("DELETE FROM COURSE_SEARCH")
+    database.execute(f"INSERT INTO COURSE_SEARCH (rowid, {COURSE_SEARCH_COLUMNS}) SELECT c.CRN, {COURSE_SEARCH_ROW.format(row='c')} FROM COURSE c")
+
+# Indexes for the sortable course listing (see LeopardWebListing). Each one
+# also holds the CRN, so a page sorted by title or department is a range scan
+# and jumping deep into the list skips index entries instead of sorting COURSE.
+LISTING_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_course_title ON COURSE (TITLE)",
+    "CREATE INDEX IF NOT EXISTS idx_course_department ON COURSE (DEPARTMENT)",
+]
+
+# Per-student counter of changes to the set of courses they are registered for,
+# bumped by triggers on every registration, dropped course and change to a
+# course's meeting time. Sessions cache a student's meeting masks together with
+# the counter, so a write from any session, admin or process makes them reload.
+SCHEDULE_VERSION_BUMP = "INSERT INTO SCHEDULE_VERSION (student_id, version) {rows} ON CONFLICT (student_id) DO UPDATE SET version = version + 1"
+SCHEDULE_VERSIONS = [
+    """CREATE TABLE IF NOT EXISTS SCHEDULE_VERSION (
+        student_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS schedule_version_insert AFTER INSERT ON REGISTRATION BEGIN
+        {SCHEDULE_VERSION_BUMP.format(rows="VALUES (new.student_id, 1)")};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS schedule_version_delete AFTER DELETE ON REGISTRATION BEGIN
+        {SCHEDULE_VERSION_BUMP.format(rows="VALUES (old.student_id, 1)")};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS schedule_version_course_update AFTER UPDATE OF SEMESTER, YEAR, MEETING_MASK ON COURSE BEGIN
+        {SCHEDULE_VERSION_BUMP.format(rows="SELECT student_id, 1 FROM REGISTRATION WHERE course_code = old.CRN")};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS schedule_version_course_delete AFTER DELETE ON COURSE BEGIN
+        {SCHEDULE_VERSION_BUMP.format(rows="SELECT student_id, 1 FROM REGISTRATION WHERE course_code = old.CRN")};
+    END""",
+]
+
+# Ordered schema migrations as (version, description, statements). Append new
+# steps to the end with the next version number; never edit a shipped step.
+# Statements may be SQL strings or functions that take the connection.
+MIGRATIONS = [
+    (1, "Base tables", BASE_TABLES),
+    (2, "Secondary indexes for roster and instructor lookups", INDEXES),
+    (3, "Seat capacity and enrollment counter", SEAT_CAPACITY),
+    (4, "Waitlist queue", WAITLIST),
+    (5, "Weekly meeting bitmask per course", MEETING_MASKS),
+    (6, "Full-text course search index", COURSE_SEARCH),
+    (7, "Indexes for sorted course listings", LISTING_INDEXES),
+    (8, "Schedule change counter per student", SCHEDULE_VERSIONS),
+]
+
+# Function to read the schema version a database is at (0 for a new database)
+def current_version(database):
+    database.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""")
+    return database.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+# Function to bring a database up to the latest (or a given) schema version.
+# Each step runs in its own write transaction and is skipped if another
+# connection applied it first. Returns the list of versions applied. The steps
+# commit, so the caller must commit or roll back its own work first; an open
+# transaction raises ProgrammingError rather than being committed here.
+def migrate(database, target=None):
+    if database.in_transaction:
+        raise sql.ProgrammingError("Commit or roll back the open transaction before migrating.")
+    latest = current_version(database)
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        if version <= latest:
+            continue
+        database.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(database) >= version:
+                database.rollback()
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(database)
+                else:
+                    database.execute(statement)
+            database.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (version, description))
+            database.commit()
+        except BaseException:
+            database.rollback()
+            raise
+        applied.append(version)
+    return applied
@@ -0,0 +1,77 @@
+import re
+
+# Fields courses can be searched by, mapped to the COURSE_SEARCH column they
+# match against (None searches every column). Only these names ever reach the
+# SQL text; 'crn' is answered from the COURSE primary key instead.
+SEARCH_FIELDS = {
+    "any": None,
+    "all": None,
+    "course code": "CRN",
+    "crn": "CRN",
+    "name": "title",
+    "title": "title",
+    "department": "department",
+    "instructor": "instructor",
+    "semester": "semester",
+    "schedule": "meeting",
+    "time": "meeting",
+    "days": "meeting",
+    "meeting": "meeting",
+}
+
+# Default number of results returned by find_courses
+RESULT_LIMIT = 50
+
+# Queries matching more courses than this are not ranked. bm25 has to visit
+# every match, so ranking is only worth it while the search is selective; a
+# term that matches thousands of sections returns them in CRN order instead.
+RANK_WINDOW = 1000
+
+# Columns where relevance means something. Department, semester and meeting
+# matches are all equally good, so those searches skip ranking and return in CRN order.
+RANKED_COLUMNS = {None, "title", "instructor"}
+
+# Function to turn free text into an FTS5 query. Every word must match and the
+# last one is a prefix, as it may still be being typed, so 'mwf 8:0' finds
+# 'MWF 8:00-8:50'. Only word characters are kept, so the text cannot inject FTS syntax.
+def match_expression(column, value):
+    phrases = []
+    for word in str(value).split():
+        tokens = re.findall(r"\w+", word)
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    if not phrases:
+        return None
+    expression = " ".join(phrases) + "*"
+    return f"{{{column}}} : ({expression})" if column else expression
+
+# Function to search courses by one whitelisted field, best matches first.
+# Returns (CRN, TITLE, instructor NAME, TIME) rows.
+def find_courses(database, parameter, value, limit=RESULT_LIMIT):
+    field = parameter.lower()
+    if field not in SEARCH_FIELDS:
+        raise ValueError(f"Cannot search courses by {parameter}.")
+    column = SEARCH_FIELDS[field]
+    if column == "CRN":
+        if not str(value).strip().isdigit():
+            return []
+        return database.execute("SELECT c.CRN, c.TITLE, i.NAME, c.TIME FROM COURSE c LEFT JOIN INSTRUCTOR i ON c.instructor_id = i.ID WHERE c.CRN = ?",
+                                (int(value),)).fetchall()
+
+    expression = match_expression(column, value)
+    if expression is None:
+        return []
+    window = RANK_WINDOW + 1 if column in RANKED_COLUMNS else limit
+    matches = [row[0] for row in database.execute("SELECT rowid FROM COURSE_SEARCH WHERE COURSE_SEARCH MATCH ? LIMIT ?", (expression, window))]
+    if len(matches) > RANK_WINDOW or column not in RANKED_COLUMNS:
+        crns = matches[:limit]
+        placeholders = ", ".join("?" for _ in crns)
+        return database.execute(f"SELECT c.CRN, c.TITLE, i.NAME, c.TIME FROM COURSE c LEFT JOIN INSTRUCTOR i ON c.instructor_id = i.ID WHERE c.CRN IN ({placeholders}) ORDER BY c.CRN",
+                                crns).fetchall()
+    return database.execute("""
+        SELECT c.CRN, c.TITLE, i.NAME, c.TIME
+        FROM (SELECT rowid AS CRN, rank FROM COURSE_SEARCH WHERE COURSE_SEARCH MATCH ? ORDER BY rank LIMIT ?) s
+        JOIN COURSE c ON c.CRN = s.CRN
+        LEFT JOIN INSTRUCTOR i ON c.instructor_id = i.ID
+        ORDER BY s.rank
+    """, (expression, limit)).fetchall()
@@ -0,0 +1,95 @@
+import json
+
+from LeopardWebSchedule import decode_mask
+from LeopardWebWriter import WriteAborted
+
+# The registration writes shared by the GUI and the command line. Each one runs
+# in the caller's transaction, so the caller decides when it commits; triggers
+# on REGISTRATION keep SCHEDULE_VERSION current, so nothing here needs to tell
+# the sessions whose cached schedules a write changed.
+
+# Function to register a student for a course. The seat is taken with a conditional
+# update in the same transaction as the insert, so students competing for the last
+# seats can never oversell a section. Returns "added", "full" or "invalid".
+def reserve_seat(database, student_id, course_code):
+    reserved = database.execute("UPDATE COURSE SET ENROLLED = ENROLLED + 1 WHERE CRN = ? AND ENROLLED < CAPACITY", (course_code,)).rowcount
+    if not reserved:
+        exists = database.execute("SELECT 1 FROM COURSE WHERE CRN = ?", (course_code,)).fetchone()
+        return "full" if exists else "invalid"
+    database.execute("INSERT INTO REGISTRATION (student_id, course_code) VALUES (?, ?)", (student_id, course_code))
+    return "added"
+
+# Function to put a student at the back of a full course's waitlist. Returns
+# their place in the queue, or None if they are already registered or waiting.
+def join_waitlist(database, student_id, course_code):
+    registered = database.execute("SELECT 1 FROM REGISTRATION WHERE student_id = ? AND course_code = ?", (student_id, course_code)).fetchone()
+    if registered:
+        return None
+    cursor = database.execute("INSERT OR IGNORE INTO WAITLIST (student_id, course_code) VALUES (?, ?)", (student_id, course_code))
+    if not cursor.rowcount:
+        return None
+    return database.execute("SELECT COUNT(*) FROM WAITLIST WHERE course_code = ? AND ID <= ?", (course_code, cursor.lastrowid)).fetchone()[0]
+
+# Function to find a course a student is registered for in a term whose meeting
+# mask overlaps `mask`; returns its CRN, or None
+def conflicting_course(database, student_id, semester, year, mask):
+    cursor = database.execute("""
+        SELECT c.CRN, c.MEETING_MASK
+        FROM REGISTRATION r
+        JOIN COURSE c ON c.CRN = r.course_code
+        WHERE r.student_id = ? AND c.SEMESTER = ? AND c.YEAR = ?
+    """, (student_id, semester, year))
+    for crn, blob in cursor:
+        if decode_mask(blob) & mask:
+            return crn
+    return None
+
+# Function to move students from the head of a course's waitlist into any free
+# seats. Runs in the caller's transaction; returns the promoted student IDs.
+# A student who has registered for an overlapping course since joining the
+# queue is taken off it instead of being promoted into a time conflict.
+def promote_from_waitlist(database, course_code):
+    course = database.execute("SELECT SEMESTER, YEAR, MEETING_MASK FROM COURSE WHERE CRN = ?", (course_code,)).fetchone()
+    mask = decode_mask(course[2]) if course else 0
+    promoted = []
+    while True:
+        head = database.execute("SELECT ID, student_id FROM WAITLIST WHERE course_code = ? ORDER BY ID LIMIT 1", (course_code,)).fetchone()
+        if head is None:
+            break
+        if mask and conflicting_course(database, head[1], course[0], course[1], mask) is not None:
+            database.execute("DELETE FROM WAITLIST WHERE ID = ?", (head[0],))
+            continue
+        if not database.execute("UPDATE COURSE SET ENROLLED = ENROLLED + 1 WHERE CRN = ? AND ENROLLED < CAPACITY", (course_code,)).rowcount:
+            break
+        database.execute("DELETE FROM WAITLIST WHERE ID = ?", (head[0],))
+        database.execute("INSERT INTO REGISTRATION (student_id, course_code) VALUES (?, ?)", (head[1], course_code))
+        promoted.append(head[1])
+    return promoted
+
+# Function to drop a registration, or a place on the waitlist, in one transaction.
+# A freed seat goes straight to the head of the waitlist.
+def release_seat(database, student_id, course_code):
+    deleted = database.execute("DELETE FROM REGISTRATION WHERE student_id = ? AND course_code = ?", (student_id, course_code)).rowcount
+    if deleted:
+        database.execute("UPDATE COURSE SET ENROLLED = ENROLLED - 1 WHERE CRN = ?", (course_code,))
+        promote_from_waitlist(database, course_code)
+    else:
+        database.execute("DELETE FROM WAITLIST WHERE student_id = ? AND course_code = ?", (student_id, course_code))
+    return deleted > 0
+
+# Function to take a seat in a course, or a place on its waitlist when it is full.
+# Returns (status, waitlist position) with the status from reserve_seat.
+def reserve_or_wait(database, student_id, course_code):
+    status = reserve_seat(database, student_id, course_code)
+    if status == "full":
+        return status, join_waitlist(database, student_id, course_code)
+    return status, None
+
+# Function to take a seat in every course of a cart and register the student for
+# them. Raises WriteAborted if any course has filled up, so no seat is kept.
+def reserve_cart(database, student_id, cart):
+    reserved = database.execute("UPDATE COURSE SET ENROLLED = ENROLLED + 1 WHERE CRN IN (SELECT value FROM json_each(?)) AND ENROLLED < CAPACITY",
+                                (json.dumps(cart),)).rowcount
+    if reserved != len(cart):
+        raise WriteAborted("A course in your cart has just filled up.")
+    database.executemany("INSERT INTO REGISTRATION (student_id, course_code) VALUES (?, ?)", [(student_id, course_code) for course_code in cart])
@@ -0,0 +1,82 @@
+import sqlite3 as sql
+
+from LeopardWebSchedule import encode_mask, meeting_mask
+from LeopardWebSchema import SCHEDULE_VERSION_BUMP, rebuild_course_search
+
+# Column order expected for each kind of record passed to bulk_load. An ID of
+# None lets SQLite assign the next AUTOINCREMENT value.
+USER_COLUMNS = ("ID", "username", "password", "role")
+STUDENT_COLUMNS = ("ID", "NAME", "SURNAME", "USERNAME", "GRADYEAR", "MAJOR", "EMAIL")
+INSTRUCTOR_COLUMNS = ("ID", "NAME", "SURNAME", "TITLE", "HIREYEAR", "DEPT", "EMAIL")
+ADMIN_COLUMNS = ("ID", "NAME", "SURNAME", "TITLE", "OFFICE", "EMAIL")
+COURSE_COLUMNS = ("CRN", "TITLE", "DEPARTMENT", "TIME", "DAYS", "SEMESTER", "YEAR", "CREDITS", "instructor_id", "CAPACITY")
+REGISTRATION_COLUMNS = ("student_id", "course_code")
+
+# Tables in the order they are loaded, so referenced rows always exist first
+LOAD_ORDER = [
+    ("users", "USER", USER_COLUMNS),
+    ("students", "STUDENT", STUDENT_COLUMNS),
+    ("instructors", "INSTRUCTOR", INSTRUCTOR_COLUMNS),
+    ("admins", "ADMIN", ADMIN_COLUMNS),
+    ("courses", "COURSE", COURSE_COLUMNS),
+    ("registrations", "REGISTRATION", REGISTRATION_COLUMNS),
+]
+
+# Function to insert many records with executemany inside a single transaction.
+# Each argument is an iterable of tuples in the matching *_COLUMNS order.
+# With defer_indexes the secondary indexes on the loaded tables are dropped
+# first and rebuilt once at the end, which is much cheaper than updating them
+# row by row; the course search triggers are deferred the same way and the
+# search index rebuilt. Either every record is written or none are. Returns row counts.
+# Like migrate, it refuses to start inside the caller's open transaction.
+def bulk_load(database, users=(), students=(), instructors=(), admins=(), courses=(), registrations=(), defer_indexes=True):
+    records = {"users": users, "students": students, "instructors": instructors,
+               "admins": admins, "courses": courses, "registrations": registrations}
+    if database.in_transaction:
+        raise sql.ProgrammingError("Commit or roll back the open transaction before bulk loading.")
+
+    counts = {}
+    database.execute("BEGIN IMMEDIATE")
+    try:
+        deferred = []
+        deferred_triggers = []
+        if defer_indexes:
+            tables = [table for key, table, _ in LOAD_ORDER if records[key]]
+            if tables:
+                placeholders = ", ".join("?" for _ in tables)
+                deferred = database.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+                                            tables).fetchall()
+                deferred_triggers = database.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND (name LIKE 'course_search%' OR name LIKE 'schedule_version%') AND tbl_name IN ({placeholders})",
+                                                     tables).fetchall()
+            for name, _ in deferred:
+                database.execute(f"DROP INDEX {name}")
+            for name, _ in deferred_triggers:
+                database.execute(f"DROP TRIGGER {name}")
+
+        # The meeting bitmask is derived from DAYS and TIME rather than passed in
+        records["courses"] = (tuple(record) + (encode_mask(meeting_mask(record[4], record[3])),) for record in courses)
+
+        for key, table, columns in LOAD_ORDER:
+            if key == "courses":
+                columns = columns + ("MEETING_MASK",)
+            column_list = ", ".join(columns)
+            placeholders = ", ".join("?" for _ in columns)
+            cursor = database.executemany(f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})", records[key])
+            counts[key] = max(cursor.rowcount, 0)
+
+        for _, statement in deferred + deferred_triggers:
+            database.execute(statement)
+        if deferred_triggers:
+            rebuild_course_search(database)
+            # One bump per loaded student instead of one per registration row
+            database.execute(SCHEDULE_VERSION_BUMP.format(rows="SELECT DISTINCT student_id, 1 FROM REGISTRATION WHERE true"))
+
+        # Bring the enrollment counters in line with the loaded registrations,
+        # once the roster index is back so each count is an index lookup
+        if counts["registrations"]:
+            database.execute("UPDATE COURSE SET ENROLLED = (SELECT COUNT(*) FROM REGISTRATION WHERE course_code = COURSE.CRN)")
+        database.commit()
+    except BaseException:
+        database.rollback()
+        raise
+    return counts
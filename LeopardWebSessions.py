@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# Define the Session class
+# What the store remembers about one login, so requests made with its token
+# need neither the password nor a USER lookup
+class Session:
+    __slots__ = ("user_id", "username", "role", "profile", "expires")
+
+    def __init__(self, user_id, username, role, profile, expires):
+        self.user_id = user_id
+        self.username = username
+        self.role = role
+        self.profile = profile  # Role-specific details read once at login
+        self.expires = expires
+
+# Define the SessionStore class
+# In-memory sessions behind signed tokens of the form <session id>.<signature>,
+# where the signature is an HMAC of the ID under the store's secret. A token
+# that was not issued here is rejected by its signature before any lookup.
+# Sessions expire `ttl` seconds after they were last used and the store keeps
+# at most `size` of them, dropping the least recently used. Every use pushes a
+# session to the back and extends it by the same ttl, so the front of the LRU is
+# always the one that expires first and purging stops at the first live one.
+# Tokens are only good in the process that issued them; a shared `secret` lets
+# other processes check signatures but they still need the session itself.
+class SessionStore:
+    def __init__(self, ttl=1800, size=4096, secret=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.size = size
+        self.clock = clock
+        self._secret = secret or os.urandom(32)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Start a session and return its token
+    def create(self, user_id, username, role, profile=None):
+        session_id = secrets.token_urlsafe(24)
+        with self._lock:
+            self._purge()
+            self._sessions[session_id] = Session(user_id, username, role, profile, self.clock() + self.ttl)
+            while len(self._sessions) > self.size:
+                self._sessions.popitem(last=False)
+        return f"{session_id}.{self._sign(session_id)}"
+
+    # Return the live Session of a token and extend it, or None if the token is
+    # forged, expired or revoked
+    def get(self, token):
+        session_id = self._session_id(token)
+        if session_id is None:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            now = self.clock()
+            if session.expires <= now:
+                del self._sessions[session_id]
+                return None
+            session.expires = now + self.ttl
+            self._sessions.move_to_end(session_id)
+            return session
+
+    # End one session, e.g. at logout
+    def revoke(self, token):
+        session_id = self._session_id(token)
+        if session_id is not None:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+
+    # End every session of a user, e.g. after the user is removed
+    def revoke_user(self, user_id):
+        with self._lock:
+            for session_id in [session_id for session_id, session in self._sessions.items() if session.user_id == user_id]:
+                del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _sign(self, session_id):
+        digest = hmac.new(self._secret, session_id.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+    # The session ID of a correctly signed token, or None. The signatures are
+    # compared as bytes, as compare_digest refuses str with non-ASCII characters,
+    # and a token that is not text at all is as invalid as a forged one.
+    def _session_id(self, token):
+        try:
+            session_id, _, signature = (token or "").partition(".")
+            if not session_id or not hmac.compare_digest(signature.encode(), self._sign(session_id).encode()):
+                return None
+        except (TypeError, ValueError):
+            return None
+        return session_id
+
+    # Drop expired sessions from the front of the LRU; the caller holds the lock
+    def _purge(self):
+        now = self.clock()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.expires > now:
+                break
+            del self._sessions[session_id]
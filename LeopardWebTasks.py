@@ -0,0 +1,111 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Define the Task class
+# Handle on one background call. The worker updates `progress` as it goes and the
+# UI thread may cancel() at any time: a cancelled task never calls back, and one
+# made of steps stops before its next step.
+class Task:
+    __slots__ = ("progress", "finished", "_cancelled")
+
+    def __init__(self):
+        self.progress = 0
+        self.finished = False
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+# Define the BackgroundTasks class
+# Runs data-access calls on worker threads so the Tk mainloop never waits on
+# SQLite. Workers only put outcomes on a queue; the UI thread drains it from
+# root.after while anything is pending, so every callback runs on the Tk thread
+# and no worker ever touches a widget.
+class BackgroundTasks:
+    def __init__(self, root, workers=2, poll_interval=20):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="LeopardWebTask")
+        self._outcomes = queue.Queue()
+        self._pending = 0
+        self._polling = False
+
+    # Run call() on a worker; on_done(result) or on_error(exception) is called
+    # back on the UI thread unless the task is cancelled first. Without on_error
+    # the exception is raised from the Tk callback, which reports it.
+    def submit(self, call, on_done=None, on_error=None):
+        task = Task()
+        self._start(task, call, on_done, on_error)
+        return task
+
+    # Run steps() on a worker and collect what it yields into a list, counting
+    # the items in task.progress and stopping early if the task is cancelled.
+    # steps is called on the worker, so a generator's query starts there too.
+    def submit_steps(self, steps, on_done=None, on_error=None):
+        task = Task()
+
+        def collect():
+            items = []
+            iterator = iter(steps())
+            try:
+                for item in iterator:
+                    if task.cancelled:
+                        break
+                    items.append(item)
+                    task.progress = len(items)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close:
+                    close()
+            return items
+
+        self._start(task, collect, on_done, on_error)
+        return task
+
+    # Stop taking work; calls already running finish on their own
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, task, work, on_done, on_error):
+        def run():
+            try:
+                outcome = (True, work())
+            except Exception as error:
+                outcome = (False, error)
+            self._outcomes.put((task, outcome, on_done, on_error))
+
+        self._pending += 1
+        self._executor.submit(run)
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    # Deliver finished outcomes on the UI thread, and keep polling while work is pending
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    task, (succeeded, value), on_done, on_error = self._outcomes.get_nowait()
+                except queue.Empty:
+                    break
+                self._pending -= 1
+                task.finished = True
+                if task.cancelled:
+                    continue
+                if succeeded:
+                    if on_done:
+                        on_done(value)
+                elif on_error:
+                    on_error(value)
+                else:
+                    raise value
+        finally:
+            if self._pending:
+                self.root.after(self.poll_interval, self._poll)
+            else:
+                self._polling = False
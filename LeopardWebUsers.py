@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+
+# Define the UserDirectory class
+# Process-wide LRU map of username -> USER.ID, so registration writes made for
+# another user (the admin methods) can use the ID directly instead of looking
+# the username up inside every statement. Usernames are unique and a user's ID
+# never changes, so an entry only goes stale when the user is removed, which
+# Admin.remove_user handles by calling forget().
+class UserDirectory:
+    def __init__(self, size=4096):
+        self.size = size
+        self._pool = None
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Return the ID of a username, or None if there is no such user. Misses are
+    # not cached, so a user added later is found on the next lookup. A different
+    # pool (another database) starts from an empty map.
+    def resolve(self, pool, username):
+        with self._lock:
+            if self._pool is not pool:
+                self._ids.clear()
+                self._pool = pool
+            elif username in self._ids:
+                self._ids.move_to_end(username)
+                return self._ids[username]
+        with pool.connection() as database:
+            row = database.execute("SELECT ID FROM USER WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        self.add(pool, username, row[0])
+        return row[0]
+
+    # Remember the ID of a username that is already known, e.g. after login or add_user
+    def add(self, pool, username, user_id):
+        with self._lock:
+            if self._pool is not pool:
+                self._ids.clear()
+                self._pool = pool
+            self._ids[username] = user_id
+            self._ids.move_to_end(username)
+            while len(self._ids) > self.size:
+                self._ids.popitem(last=False)
+
+    # Drop a username after the user has been removed
+    def forget(self, username):
+        with self._lock:
+            self._ids.pop(username, None)
+
+    # Forget everything
+    def invalidate(self):
+        with self._lock:
+            self._ids.clear()
+            self._pool = None
+
+    def __len__(self):
+        return len(self._ids)
@@ -0,0 +1,167 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Define the VirtualList class
+# A Treeview over a Listing (see LeopardWebListing) of any length that only
+# ever holds the rows on screen. The scrollbar is driven by the row count, and
+# scrolling asks the listing for the rows now in view: from its page cache
+# straight away, or through the background tasks when a page has to be read.
+# Clicking a heading sorts by that column and the filter box narrows the rows;
+# both build a new listing, so the work is done by SQL. While a count or a page
+# is being read the status line says so and Cancel (or Escape) drops the wait;
+# the next scroll, sort or filter starts a fresh read.
+class VirtualList(tk.Frame):
+    def __init__(self, master, tasks, make_listing, columns, visible_rows=20, on_activate=None):
+        super().__init__(master)
+        self.tasks = tasks
+        self.make_listing = make_listing  # (sort, descending, text) -> Listing
+        self.columns = columns  # (column name, heading, width) in the listing's column order
+        self.visible_rows = visible_rows
+        self.on_activate = on_activate  # Called with the values of a double-clicked row
+        self.sort = columns[0][0]
+        self.descending = False
+        self.text = ""
+        self.listing = None
+        self.total = None  # Row count of the listing, None until it has been read
+        self.top = 0
+        self.task = None  # The background read in progress, if any
+
+        filter_row = tk.Frame(self)
+        filter_row.pack(fill="x", padx=5, pady=5)
+        tk.Label(filter_row, text="Filter:").pack(side="left")
+        self.filter_entry = tk.Entry(filter_row)
+        self.filter_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.filter_entry.bind("<Return>", lambda event: self.apply_filter())
+        tk.Button(filter_row, text="Apply", command=self.apply_filter).pack(side="left")
+
+        body = tk.Frame(self)
+        body.pack(fill="both", expand=True, padx=5)
+        self.tree = ttk.Treeview(body, columns=[column for column, _, _ in columns], show="headings", height=visible_rows, selectmode="browse")
+        for column, heading, width in columns:
+            self.tree.heading(column, text=heading, command=lambda column=column: self.sort_by(column))
+            self.tree.column(column, width=width, stretch=True)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient="vertical", command=self.scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        status_row = tk.Frame(self)
+        status_row.pack(fill="x", padx=5, pady=5)
+        self.status = tk.Label(status_row, anchor="w")
+        self.status.pack(side="left", fill="x", expand=True)
+        self.cancel_button = tk.Button(status_row, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_button.pack(side="right")
+
+        self.tree.bind("<MouseWheel>", lambda event: self.move(-1 if event.delta > 0 else 1))
+        self.tree.bind("<Button-4>", lambda event: self.move(-1))
+        self.tree.bind("<Button-5>", lambda event: self.move(1))
+        self.tree.bind("<Prior>", lambda event: self.move(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.move(self.visible_rows))
+        self.tree.bind("<Double-1>", lambda event: self.activate())
+        self.tree.bind("<Return>", lambda event: self.activate())
+        self.tree.bind("<Escape>", lambda event: self.cancel())
+        self.reset()
+
+    # Values of the selected row, or None
+    def selected(self):
+        selection = self.tree.selection()
+        return self.tree.item(selection[0], "values") if selection else None
+
+    def activate(self):
+        values = self.selected()
+        if values and self.on_activate:
+            self.on_activate(values)
+
+    def apply_filter(self):
+        self.text = self.filter_entry.get()
+        self.reset()
+
+    # Sort by a column, or flip the direction if it is already the sort column
+    def sort_by(self, column):
+        self.descending = not self.descending if column == self.sort else False
+        self.sort = column
+        self.reset()
+
+    # Start over with a new listing for the current sort and filter
+    def reset(self):
+        self.cancel(quietly=True)
+        self.listing = self.make_listing(self.sort, self.descending, self.text)
+        self.top = 0
+        self.total = None
+        for column, heading, _ in self.columns:
+            arrow = (" ▼" if self.descending else " ▲") if column == self.sort else ""
+            self.tree.heading(column, text=heading + arrow)
+        self.show()
+
+    # Run a read of the current listing in the background, showing it as busy
+    # until it finishes, fails or is cancelled
+    def fetch(self, message, call, on_done):
+        listing = self.listing
+
+        def done(result):
+            if listing is self.listing:
+                self.finished()
+                on_done(result)
+
+        def failed(error):
+            if listing is self.listing:
+                self.finished()
+                self.status.config(text=f"Error: {error}")
+
+        self.task = self.tasks.submit(call, done, failed)
+        self.cancel_button.config(state="normal")
+        self.status.config(text=message)
+
+    def finished(self):
+        self.task = None
+        self.cancel_button.config(state="disabled")
+
+    # Stop waiting for the read in progress; its result is thrown away
+    def cancel(self, quietly=False):
+        if self.task is None:
+            return
+        self.task.cancel()
+        self.finished()
+        if not quietly:
+            self.status.config(text="Cancelled. Scroll, sort or filter to load again.")
+
+    def counted(self, total):
+        self.total = total
+        self.show()
+
+    # Scrollbar callback: ("moveto", fraction) or ("scroll", count, "units" or "pages")
+    def scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.move_to(int(float(amount) * (self.total or 0)))
+        elif action == "scroll":
+            self.move(int(amount) * (self.visible_rows if unit == "pages" else 1))
+
+    def move(self, rows):
+        self.move_to(self.top + rows)
+
+    def move_to(self, top):
+        self.top = max(0, min(top, (self.total or 0) - self.visible_rows))
+        self.show()
+
+    # Draw the rows in view if their pages are cached, otherwise read them in the
+    # background and draw once they arrive (for wherever the view is by then).
+    # The row count is read first, along with the first screenful.
+    def show(self):
+        if self.total is None:
+            if self.task is None:
+                listing = self.listing
+                self.fetch("Counting rows...", lambda: (listing.count(), listing.rows(0, self.visible_rows)), lambda result: self.counted(result[0]))
+            return
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min((self.top + self.visible_rows) / self.total, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        rows = self.listing.cached_rows(self.top, self.visible_rows)
+        if rows is None:
+            if self.task is None:
+                listing, top = self.listing, self.top
+                self.fetch(f"Loading rows {top + 1}-{min(top + self.visible_rows, self.total)}...", lambda: listing.rows(top, self.visible_rows), lambda rows: self.show())
+            return
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", "end", values=row)
+        last = self.top + len(rows)
+        self.status.config(text=f"Rows {self.top + 1 if rows else 0}-{last} of {self.total}")
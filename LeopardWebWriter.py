@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from LeopardWebPool import DEFAULT_PROFILE, connect, is_busy_error
+
+# Raised by a write operation to undo everything it wrote and report why
+class WriteAborted(Exception):
+    pass
+
+# Define the GroupCommitWriter class
+# One thread that owns the only writing connection to a database. Callers queue
+# write operations, functions that take the connection and must not commit, and
+# the thread runs everything that queued up while the previous batch was
+# committing in a single transaction with one commit, so N concurrent writes
+# cost one fsync instead of N. A `window` above 0 also waits that many seconds
+# for more writes before committing, trading latency for bigger batches.
+# Each operation runs in its own savepoint: one that raises is rolled back on its
+# own and its caller gets the exception, while the rest of the batch commits.
+class GroupCommitWriter:
+    def __init__(self, path, profile=DEFAULT_PROFILE, window=0.0, max_batch=256):
+        self.path = path
+        self.profile = profile
+        self.window = window
+        self.max_batch = max_batch
+        self.commits = 0
+        self.operations = 0
+        self._requests = queue.Queue()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._connection = connect(path, profile, check_same_thread=False, isolation_level=None)
+        self._thread = threading.Thread(target=self._loop, name="LeopardWebWriter", daemon=True)
+        self._thread.start()
+
+    # Queue an operation; returns a Future for its result
+    def submit(self, operation, *args):
+        future = Future()
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("The writer has been closed.")
+            self._requests.put((operation, args, future))
+        return future
+
+    # Queue an operation and wait until its transaction has committed. Returns
+    # the operation's result, or raises what it raised.
+    def run(self, operation, *args):
+        return self.submit(operation, *args).result()
+
+    # Finish the queued writes and stop the thread
+    def close(self):
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._requests.put(None)
+        self._thread.join()
+        self._connection.close()
+
+    # Collect the next batch: everything already queued, plus whatever arrives
+    # within the window. Returns (batch, stop).
+    def _next_batch(self):
+        first = self._requests.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                request = self._requests.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _loop(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._commit(batch)
+
+    # Run a batch in one transaction, retrying the whole batch with backoff while
+    # another connection holds the lock, then hand every caller its outcome
+    def _commit(self, batch):
+        for attempt in range(self.profile.busy_retries + 1):
+            try:
+                outcomes = self._apply(batch)
+                self._connection.execute("COMMIT")
+                self.commits += 1
+                self.operations += len(batch)
+                break
+            except Exception as error:
+                if self._connection.in_transaction:
+                    self._connection.execute("ROLLBACK")
+                if not is_busy_error(error) or attempt == self.profile.busy_retries:
+                    outcomes = [(False, error)] * len(batch)
+                    break
+                time.sleep(self.profile.backoff(attempt))
+        for (_, _, future), (succeeded, value) in zip(batch, outcomes):
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _apply(self, batch):
+        database = self._connection
+        database.execute("BEGIN IMMEDIATE")
+        outcomes = []
+        for operation, args, _ in batch:
+            database.execute("SAVEPOINT operation")
+            try:
+                value = operation(database, *args)
+            except Exception as error:
+                if is_busy_error(error):
+                    raise
+                database.execute("ROLLBACK TO operation")
+                database.execute("RELEASE operation")
+                outcomes.append((False, error))
+            else:
+                database.execute("RELEASE operation")
+                outcomes.append((True, value))
+        return outcomes
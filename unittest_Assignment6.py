@@ -181,9 +181,24 @@ class Admin(User):
             roster.append((row[0], row[1]))
         return roster
 
+# Columns search_courses may filter on; only these names ever reach the SQL text
+SEARCH_COLUMNS = {
+    "course code": "CRN",
+    "crn": "CRN",
+    "name": "TITLE",
+    "title": "TITLE",
+    "instructor": "instructor",
+    "schedule": "TIME",
+    "department": "DEPARTMENT",
+    "semester": "SEMESTER",
+}
+
 # Function to search courses
 def search_courses(parameter, value):
-    query = f"SELECT * FROM COURSE WHERE {parameter} LIKE ?"
+    column = SEARCH_COLUMNS.get(parameter.lower())
+    if column is None:
+        raise ValueError(f"Cannot search courses by {parameter}.")  # Reject anything outside the whitelist
+    query = f"SELECT * FROM COURSE WHERE {column} LIKE ?"
     cursor = database.execute(query, ('%' + value + '%',))
     courses = []
     for row in cursor:
@@ -358,6 +373,8 @@ class TestLeopardWebDatabase(unittest.TestCase):
     def test_search_courses(self):
         courses = search_courses("TITLE", "Math")
         self.assertTrue(len(courses) > 0)
+        with self.assertRaises(ValueError):
+            search_courses("TITLE LIKE '%' OR 1=1 --", "x")  # Column names cannot be injected
 
 if __name__ == '__main__':
     unittest.main(exit=False)
@@ -0,0 +1,1263 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+import sqlite3 as sql
+
+import FinalLeopardWebCode as app
+from LeopardWebPool import ConnectionPool, PoolTimeout, StorageProfile
+from LeopardWebSchema import BASE_TABLES, MIGRATIONS, current_version, migrate
+from LeopardWebSeed import bulk_load
+from LeopardWebSchedule import decode_mask, meeting_mask, parse_time, split_schedule
+from LeopardWebGenerator import generate_campus, meeting_time, populate_database
+from LeopardWebBenchmark import benchmark_group_commit, benchmark_methods, benchmark_password_hashing, percentile
+from LeopardWebUsers import UserDirectory
+from LeopardWebWriter import WriteAborted
+from LeopardWebTasks import BackgroundTasks
+from LeopardWebListing import CourseListing
+from LeopardWebPasswords import PasswordHasher, calibrate, legacy_hash
+from LeopardWebSessions import SessionStore
+
+# Build a fresh database file with the schema and a small amount of data. Users
+# get legacy SHA-256 hashes, as in a database made before salted hashing.
+def create_test_database(path):
+    database = sql.connect(path)
+    migrate(database)
+    database.execute("INSERT INTO USER (ID, username, password, role) VALUES (1, 'admin', ?, 'admin')", (legacy_hash("password"),))
+    database.execute("INSERT INTO USER (ID, username, password, role) VALUES (2, 'fourierj', ?, 'instructor')", (legacy_hash("password"),))
+    database.execute("INSERT INTO INSTRUCTOR (ID, NAME, SURNAME, TITLE, HIREYEAR, DEPT, EMAIL) VALUES (1, 'Joseph', 'Fourier', 'Full Prof.', 1820, 'BSEE', 'fourierj')")
+    database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor_id) VALUES (10001, 'Engineering Calculus', 'Math', '8:00-9:00', 'MWF', 'Fall', 2024, 4, 1)")
+    for i in range(20):
+        user_id = 100 + i
+        username = f"student{i}"
+        database.execute("INSERT INTO USER (ID, username, password, role) VALUES (?, ?, ?, 'student')", (user_id, username, legacy_hash("password")))
+        database.execute("INSERT INTO STUDENT (ID, NAME, SURNAME, USERNAME, GRADYEAR, MAJOR, EMAIL) VALUES (?, 'Student', ?, ?, '2026', 'BSCO', ?)", (user_id, str(i), username, username))
+    database.commit()
+    database.close()
+
+# Base class that points the application at a fresh temporary database
+class DatabaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        create_test_database(self.path)
+        self.pool = ConnectionPool(self.path, size=2, timeout=0.2)
+        self.original_pool = app.pool
+        app.pool = self.pool
+        # Cheap scrypt settings keep logins fast in tests
+        self.original_hasher = app.hasher
+        app.hasher = PasswordHasher(n=2 ** 10)
+
+    def tearDown(self):
+        app.hasher.shutdown()
+        app.hasher = self.original_hasher
+        app.pool = self.original_pool
+        self.pool.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    # Run call() with every connection the pool hands out traced, including the
+    # ones stream_rows checks out for itself, and return (result, SELECTs issued)
+    def trace_selects(self, call):
+        statements = []
+        acquire, release = self.pool.acquire, self.pool.release
+
+        def traced_acquire(*args, **kwargs):
+            connection = acquire(*args, **kwargs)
+            connection.set_trace_callback(statements.append)
+            return connection
+
+        def traced_release(connection):
+            connection.set_trace_callback(None)
+            release(connection)
+
+        self.pool.acquire, self.pool.release = traced_acquire, traced_release
+        try:
+            result = call()
+        finally:
+            del self.pool.acquire, self.pool.release
+        return result, [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+
+class TestConnectionPool(DatabaseTestCase):
+
+    def test_pool_is_bounded(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire(timeout=0.05)
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(), first)
+        self.pool.release(first)
+        self.pool.release(second)
+
+    def test_nested_checkout_reuses_thread_connection(self):
+        with self.pool.connection() as outer:
+            with self.pool.connection() as inner:
+                self.assertIs(outer, inner)
+
+    def test_exception_rolls_back(self):
+        with self.assertRaises(ValueError):
+            with self.pool.connection() as database:
+                database.execute("DELETE FROM COURSE")
+                raise ValueError("abort")
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("SELECT COUNT(*) FROM COURSE").fetchone()[0], 1)
+
+    def test_storage_profile_applied(self):
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(database.execute("PRAGMA synchronous").fetchone()[0], 1)
+
+    def test_run_retries_busy_errors(self):
+        self.pool.profile = StorageProfile(busy_retries=3, busy_backoff=0.001)
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise sql.OperationalError("database is locked")
+            return "done"
+
+        self.assertEqual(self.pool.run(flaky), "done")
+        self.assertEqual(len(attempts), 3)
+
+    def test_parallel_registration(self):
+        errors = []
+
+        def register(i):
+            try:
+                student = app.Student(f"student{i}", "password")
+                self.assertTrue(student.authenticate())
+                student.add_course_to_schedule(10001)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=register, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(app.Admin("admin", "password").view_roster(10001)), 20)
+
+class TestSeatCapacity(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.pool.connection() as database:
+            database.execute("UPDATE COURSE SET CAPACITY = 5 WHERE CRN = 10001")
+        self.admin = app.Admin("admin", "password")
+
+    def enrolled(self):
+        with self.pool.connection() as database:
+            return database.execute("SELECT ENROLLED FROM COURSE WHERE CRN = 10001").fetchone()[0]
+
+    def test_concurrent_registration_never_oversells(self):
+        self.pool.size = 8
+        results = []
+
+        def register(i):
+            results.append(app.Student(f"student{i}", "password").add_course_to_schedule(10001))
+
+        threads = [threading.Thread(target=register, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count("Course added to schedule and database updated."), 5)
+        waitlisted = sorted(int(result.split()[6]) for result in results if result.startswith("Course is full. You are number"))
+        self.assertEqual(waitlisted, list(range(1, 16)))
+        self.assertEqual(len(self.admin.view_roster(10001)), 5)
+        self.assertEqual(self.enrolled(), 5)
+
+    def test_drop_frees_seat(self):
+        for i in range(5):
+            app.Student(f"student{i}", "password").add_course_to_schedule(10001)
+        self.assertEqual(self.admin.add_student_to_course("student5", 10001), "Course is full.")
+        app.Student("student0", "password").edit_schedule("drop", 10001)
+        self.assertEqual(self.enrolled(), 4)
+        self.assertEqual(self.admin.add_student_to_course("student5", 10001), "Student added to course.")
+        self.admin.remove_student_from_course("student5", 10001)
+        self.admin.remove_user("student1")
+        self.assertEqual(self.enrolled(), 3)
+
+    def test_duplicate_registration_keeps_counter(self):
+        student = app.Student("student0", "password")
+        student.add_course_to_schedule(10001)
+        self.assertEqual(student.add_course_to_schedule(10001), "You are already registered for this course.")
+        self.assertEqual(self.enrolled(), 1)
+
+class TestWaitlist(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pool.size = 8
+        with self.pool.connection() as database:
+            database.execute("UPDATE COURSE SET CAPACITY = 5 WHERE CRN = 10001")
+        self.admin = app.Admin("admin", "password")
+        self.students = [app.Student(f"student{i}", "password") for i in range(20)]
+        for student in self.students[:5]:
+            student.add_course_to_schedule(10001)
+
+    def registered(self):
+        with self.pool.connection() as database:
+            return {row[0] for row in database.execute("SELECT u.username FROM REGISTRATION r JOIN USER u ON u.ID = r.student_id WHERE r.course_code = 10001")}
+
+    def waiting(self):
+        with self.pool.connection() as database:
+            return [row[0] for row in database.execute("SELECT u.username FROM WAITLIST w JOIN USER u ON u.ID = w.student_id WHERE w.course_code = 10001 ORDER BY w.ID")]
+
+    def test_full_course_joins_waitlist_in_order(self):
+        self.assertEqual(self.students[5].add_course_to_schedule(10001), "Course is full. You are number 1 on the waitlist.")
+        self.assertEqual(self.students[6].add_course_to_schedule(10001), "Course is full. You are number 2 on the waitlist.")
+        self.assertEqual(self.students[5].add_course_to_schedule(10001), "Course is full. You are already registered or on the waitlist for this course.")
+        self.assertEqual(self.students[0].add_course_to_schedule(10001), "Course is full. You are already registered or on the waitlist for this course.")
+        self.assertEqual(self.waiting(), ["student5", "student6"])
+
+    def test_drop_promotes_head_of_waitlist(self):
+        for student in self.students[5:8]:
+            student.add_course_to_schedule(10001)
+        self.students[0].edit_schedule("drop", 10001)
+        self.assertIn("student5", self.registered())
+        self.assertEqual(self.waiting(), ["student6", "student7"])
+
+        self.admin.remove_student_from_course("student1", 10001)
+        self.admin.remove_user("student2")
+        self.assertEqual(self.registered(), {"student3", "student4", "student5", "student6", "student7"})
+        self.assertEqual(self.waiting(), [])
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("SELECT ENROLLED FROM COURSE WHERE CRN = 10001").fetchone()[0], 5)
+
+    def test_leaving_waitlist(self):
+        self.students[5].add_course_to_schedule(10001)
+        self.students[6].add_course_to_schedule(10001)
+        self.students[5].edit_schedule("drop", 10001)
+        self.students[0].edit_schedule("drop", 10001)
+        self.assertIn("student6", self.registered())
+        self.assertNotIn("student5", self.registered())
+
+    def test_simultaneous_drops(self):
+        for student in self.students[5:15]:
+            student.add_course_to_schedule(10001)
+        threads = [threading.Thread(target=student.edit_schedule, args=("drop", 10001)) for student in self.students[:5]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.registered(), {f"student{i}" for i in range(5, 10)})
+        self.assertEqual(self.waiting(), [f"student{i}" for i in range(10, 15)])
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("SELECT ENROLLED FROM COURSE WHERE CRN = 10001").fetchone()[0], 5)
+
+class TestGroupCommit(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pool.size = 8
+        with self.pool.connection() as database:
+            database.execute("UPDATE COURSE SET CAPACITY = 100 WHERE CRN = 10001")
+            database.commit()
+        self.writer = app.start_group_commit(window=0.02)
+
+    def tearDown(self):
+        app.stop_group_commit()
+        super().tearDown()
+
+    def enrolled(self):
+        with self.pool.connection() as database:
+            return database.execute("SELECT ENROLLED, (SELECT COUNT(*) FROM REGISTRATION WHERE course_code = 10001) FROM COURSE WHERE CRN = 10001").fetchone()
+
+    def test_concurrent_writes_share_commits(self):
+        students = [app.Student(f"student{i}", "password") for i in range(20)]
+        barrier = threading.Barrier(len(students))
+        results = []
+
+        def register(student):
+            barrier.wait()
+            results.append(student.add_course_to_schedule(10001))
+
+        threads = [threading.Thread(target=register, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["Course added to schedule and database updated."] * 20)
+        self.assertEqual(self.enrolled(), (20, 20))
+        self.assertEqual(self.writer.operations, 20)
+        self.assertLess(self.writer.commits, 20)
+
+    def test_failed_operation_is_rolled_back_alone(self):
+        def register_twice(database):
+            app.reserve_seat(database, 100, 10001)
+            app.reserve_seat(database, 100, 10001)
+
+        def abort(database):
+            app.reserve_seat(database, 101, 10001)
+            raise WriteAborted("changed my mind")
+
+        futures = [self.writer.submit(register_twice), self.writer.submit(abort), self.writer.submit(app.reserve_seat, 102, 10001)]
+        with self.assertRaises(sql.IntegrityError):
+            futures[0].result()
+        with self.assertRaisesRegex(WriteAborted, "changed my mind"):
+            futures[1].result()
+        self.assertEqual(futures[2].result(), "added")
+        self.assertEqual(self.enrolled(), (1, 1))
+
+    def test_stopping_flushes_and_falls_back(self):
+        future = self.writer.submit(app.reserve_seat, 100, 10001)
+        app.stop_group_commit()
+        self.assertEqual(future.result(), "added")
+        self.assertIsNone(app.writer)
+        with self.assertRaises(RuntimeError):
+            self.writer.submit(app.reserve_seat, 101, 10001)
+        self.assertEqual(app.Admin("admin", "password").add_student_to_course("student1", 10001), "Student added to course.")
+        self.assertEqual(self.enrolled(), (2, 2))
+
+# Stands in for the Tk root: after() callbacks run when pump() is called
+class ManualRoot:
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, delay, callback):
+        self.callbacks.append(callback)
+
+    def pump(self, timeout=5.0):
+        deadline = time.perf_counter() + timeout
+        while self.callbacks and time.perf_counter() < deadline:
+            callbacks, self.callbacks = self.callbacks, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.001)
+
+class TestBackgroundTasks(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.root = ManualRoot()
+        self.tasks = BackgroundTasks(self.root)
+
+    def tearDown(self):
+        self.tasks.shutdown()
+        super().tearDown()
+
+    def test_results_come_back_on_the_ui_thread(self):
+        admin = app.Admin("admin", "password")
+        results = {}
+        self.tasks.submit(admin.view_all_courses, lambda courses: results.update(done=(threading.current_thread(), courses)))
+        self.tasks.submit(lambda: app.search_courses("room", "101"), on_error=lambda error: results.update(error=(threading.current_thread(), error)))
+        self.root.pump()
+        self.assertEqual(results["done"], (threading.main_thread(), ["10001: Engineering Calculus, Math, 8:00-9:00, MWF, Fall, 2024, 4 credits"]))
+        self.assertIs(results["error"][0], threading.main_thread())
+        self.assertIsInstance(results["error"][1], ValueError)
+        self.assertEqual(self.root.callbacks, [])
+
+    def test_steps_report_progress(self):
+        results = []
+        admin = app.Admin("admin", "password")
+        for student in range(5):
+            admin.add_student_to_course(f"student{student}", 10001)
+        task = self.tasks.submit_steps(lambda: admin.iter_roster(10001), results.append)
+        self.root.pump()
+        self.assertEqual(results, [[f"Student {i}" for i in range(5)]])
+        self.assertEqual(task.progress, 5)
+        self.assertTrue(task.finished)
+
+    def test_cancel_stops_steps_without_calling_back(self):
+        started, release, closed = threading.Event(), threading.Event(), threading.Event()
+
+        def steps():
+            try:
+                yield 1
+                started.set()
+                release.wait(5)
+                yield 2
+                yield 3
+            finally:
+                closed.set()
+
+        results = []
+        task = self.tasks.submit_steps(steps, results.append, results.append)
+        self.assertTrue(started.wait(5))
+        task.cancel()
+        release.set()
+        self.root.pump()
+        self.assertTrue(closed.is_set())
+        self.assertTrue(task.finished)
+        self.assertEqual(task.progress, 1)
+        self.assertEqual(results, [])
+
+    def test_one_students_calls_wait_for_each_other(self):
+        student = app.Student("student0", "password")
+        results = []
+        with student.schedule_lock:
+            added = self.tasks.submit(lambda: student.add_course_to_schedule(10001), results.append)
+            viewed = self.tasks.submit(student.see_schedule, lambda schedule: results.append("viewed"))
+            self.root.pump(timeout=0.1)
+            self.assertFalse(added.finished or viewed.finished)
+        self.root.pump()
+        self.assertEqual(sorted(results), ["Course added to schedule and database updated.", "viewed"])
+        self.assertEqual([course.course_code for course in student.schedule], [10001])
+
+class TestMeetingMasks(unittest.TestCase):
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time("8:00-8:50"), (480, 530))
+        self.assertEqual(parse_time("12:00-1:50"), (720, 830))
+        self.assertEqual(parse_time("11:00-12:30"), (660, 750))
+        self.assertEqual(parse_time("6:30pm-9:00pm"), (1110, 1260))
+        self.assertIsNone(parse_time("TBA"))
+
+    def test_overlap(self):
+        self.assertTrue(meeting_mask("MWF", "12:00-1:50") & meeting_mask("WF", "1:00-2:00"))
+        self.assertFalse(meeting_mask("MWF", "8:00-8:50") & meeting_mask("MWF", "8:50-9:40"))
+        self.assertFalse(meeting_mask("MWF", "8:00-9:00") & meeting_mask("TR", "8:00-9:00"))
+        self.assertEqual(meeting_mask("N/A", "8:00-9:00"), 0)
+
+    def test_split_schedule(self):
+        self.assertEqual(split_schedule("mwf 8:00-8:50"), ("MWF", "8:00-8:50"))
+        self.assertEqual(split_schedule("8:00-8:50"), ("N/A", "8:00-8:50"))
+
+class TestTimeConflicts(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = app.Admin("admin", "password")
+        self.admin.add_course(20001, "Signals", "fourierj", "MWF 8:30-9:20", "BSEE", "Fall", 2024, 3)
+        self.admin.add_course(20002, "Networks", "fourierj", "MWF 9:20-10:10", "BSEE", "Fall", 2024, 3)
+        self.admin.add_course(20003, "Signals", "fourierj", "MWF 8:30-9:20", "BSEE", "Spring", 2025, 3)
+        self.student = app.Student("student0", "password")
+
+    def test_overlapping_section_rejected(self):
+        self.assertEqual(self.student.add_course_to_schedule(20001), "Course added to schedule and database updated.")
+        self.assertEqual(self.student.add_course_to_schedule(20002), "Course added to schedule and database updated.")
+        self.assertEqual(self.student.add_course_to_schedule(20001), "You are already registered for this course.")
+        self.assertEqual(self.student.add_course_to_schedule(20003), "Course added to schedule and database updated.")
+
+        # 10001 was written without a mask by the test fixture, so give it one overlapping 20001
+        with self.pool.connection() as database:
+            database.execute("UPDATE COURSE SET MEETING_MASK = (SELECT MEETING_MASK FROM COURSE WHERE CRN = 20001) WHERE CRN = 10001")
+        self.assertEqual(app.Student("student0", "password").add_course_to_schedule(10001), "Time conflict with course 20001 on your schedule.")
+
+    def test_drop_clears_conflict(self):
+        with self.pool.connection() as database:
+            database.execute("UPDATE COURSE SET MEETING_MASK = (SELECT MEETING_MASK FROM COURSE WHERE CRN = 20001) WHERE CRN = 10001")
+        self.student.add_course_to_schedule(20001)
+        self.assertTrue(self.student.add_course_to_schedule(10001).startswith("Time conflict"))
+        self.student.edit_schedule("drop", 20001)
+        self.assertEqual(self.student.add_course_to_schedule(10001), "Course added to schedule and database updated.")
+
+    def test_admin_course_stores_days_and_mask(self):
+        with self.pool.connection() as database:
+            days, time, blob = database.execute("SELECT DAYS, TIME, MEETING_MASK FROM COURSE WHERE CRN = 20001").fetchone()
+        self.assertEqual((days, time), ("MWF", "8:30-9:20"))
+        self.assertEqual(decode_mask(blob), meeting_mask("MWF", "8:30-9:20"))
+
+    def test_waitlist_promotion_skips_conflicting_student(self):
+        self.admin.add_course(20004, "Fields", "fourierj", "MWF 8:00-8:50", "BSEE", "Fall", 2024, 3, capacity=1)
+        holder = app.Student("student1", "password")
+        waiting = app.Student("student2", "password")
+        later = app.Student("student3", "password")
+        holder.add_course_to_schedule(20004)
+        self.assertEqual(waiting.add_course_to_schedule(20004), "Course is full. You are number 1 on the waitlist.")
+        later.add_course_to_schedule(20004)
+        # Allowed, as student2 is only waiting for the overlapping 20004
+        self.assertEqual(waiting.add_course_to_schedule(20001), "Course added to schedule and database updated.")
+        holder.edit_schedule("drop", 20004)
+        self.assertEqual([course.course_code for course in waiting.see_schedule()], [20001])
+        self.assertEqual([course.course_code for course in later.see_schedule()], [20004])
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("SELECT COUNT(*) FROM WAITLIST").fetchone()[0], 0)
+
+    def test_promotion_refreshes_cached_masks(self):
+        self.admin.add_course(20004, "Fields", "fourierj", "MWF 8:00-8:50", "BSEE", "Fall", 2024, 3, capacity=1)
+        holder = app.Student("student1", "password")
+        holder.add_course_to_schedule(20004)
+        self.student.add_course_to_schedule(20002)  # Loads student0's masks
+        self.student.add_course_to_schedule(20004)
+        holder.edit_schedule("drop", 20004)
+        self.assertEqual(self.student.add_course_to_schedule(20001), "Time conflict with course 20004 on your schedule.")
+
+    def test_admin_drop_refreshes_cached_masks(self):
+        self.assertEqual(self.student.add_course_to_schedule(20001), "Course added to schedule and database updated.")
+        self.assertTrue(self.student.add_course_to_schedule(20001).startswith("You are already"))  # Masks are cached now
+        self.admin.remove_student_from_course("student0", 20001)
+        self.assertEqual(self.student.add_course_to_schedule(20001), "Course added to schedule and database updated.")
+        self.admin.remove_course(20001)
+        self.admin.add_course(20005, "Signals", "fourierj", "MWF 8:30-9:20", "BSEE", "Fall", 2024, 3)
+        self.assertEqual(self.student.add_course_to_schedule(20005), "Course added to schedule and database updated.")
+
+    def test_stale_masks_are_reloaded_instead_of_reported(self):
+        self.student.add_course_to_schedule(20001)
+        with self.pool.connection() as database:
+            self.student.current_masks(database)
+            # A change the version counter does not see, e.g. from before it existed
+            database.execute("DROP TRIGGER schedule_version_delete")
+            database.execute("DELETE FROM REGISTRATION WHERE student_id = 100")
+            database.execute("UPDATE COURSE SET ENROLLED = 0")
+        self.assertEqual(self.student.add_course_to_schedule(20001), "Course added to schedule and database updated.")
+
+class TestRegistrationCart(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = app.Admin("admin", "password")
+        self.admin.add_course(30001, "Signals", "fourierj", "TR 9:30-10:45", "BSEE", "Fall", 2024, 4)
+        self.admin.add_course(30002, "Networks", "fourierj", "MW 1:00-2:20", "BSCO", "Fall", 2024, 4)
+        self.admin.add_course(30004, "Overlaps Signals", "fourierj", "TR 10:00-11:15", "BSEE", "Fall", 2024, 4, capacity=1)
+        self.student = app.Student("student0", "password")
+        self.student.authenticate()
+
+    def registered(self):
+        with self.pool.connection() as database:
+            return [row[0] for row in database.execute("SELECT course_code FROM REGISTRATION WHERE student_id = 100 ORDER BY course_code")]
+
+    def test_cart_commits_once(self):
+        statements = []
+        with self.pool.connection() as database:
+            database.set_trace_callback(statements.append)
+            try:
+                result = self.student.register_cart([30002, 10001, 30001])
+            finally:
+                database.set_trace_callback(None)
+        self.assertEqual(result, "3 courses added to schedule and database updated.")
+        self.assertEqual(self.registered(), [10001, 30001, 30002])
+        self.assertEqual([statement for statement in statements if statement.startswith("COMMIT")], ["COMMIT"])
+        # The cart, the student's SCHEDULE_VERSION and their meeting masks
+        self.assertEqual(len([statement for statement in statements if statement.lstrip().startswith("SELECT")]), 3)
+        self.assertEqual([course.course_code for course in self.student.schedule], [10001, 30001, 30002])
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("SELECT SUM(ENROLLED) FROM COURSE").fetchone()[0], 3)
+
+    def test_cart_is_all_or_nothing(self):
+        self.assertEqual(self.student.register_cart([30001, 30004, 99999]),
+                         "No courses were added.\n99999: Invalid course code.\n30004: Time conflict with course 30001 in your cart.")
+        self.assertEqual(self.registered(), [])
+        self.student.add_course_to_schedule(30001)
+        self.assertEqual(self.student.register_cart([30002, 30004]),
+                         "No courses were added.\n30004: Time conflict with course 30001 on your schedule.")
+        self.assertEqual(self.student.register_cart([30001, 30002]),
+                         "No courses were added.\n30001: You are already registered for this course.")
+        app.Student("student1", "password").add_course_to_schedule(30004)
+        self.assertEqual(self.student.register_cart([30004]), "No courses were added.\n30004: Course is full.")
+        self.assertEqual(self.student.register_cart([]), "Your cart is empty.")
+        self.assertEqual(self.registered(), [30001])
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("SELECT SUM(ENROLLED) FROM COURSE").fetchone()[0], 2)
+
+class TestCourseSearch(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = app.Admin("admin", "password")
+        self.admin.add_course(20001, "Fourier Analysis", "fourierj", "TR 9:30-10:45", "Math", "Spring", 2025, 3)
+
+    def codes(self, parameter, value):
+        return [course.course_code for course in app.search_courses(parameter, value)]
+
+    def test_prefix_search_by_field(self):
+        self.assertEqual(self.codes("title", "engineering calc"), [10001])
+        self.assertEqual(self.codes("title", "four"), [20001])
+        self.assertEqual(self.codes("instructor", "fourier"), [10001, 20001])
+        self.assertEqual(self.codes("semester", "spring 2025"), [20001])
+        self.assertEqual(self.codes("schedule", "TR 9:3"), [20001])
+        self.assertEqual(self.codes("crn", "10001"), [10001])
+        self.assertEqual(self.codes("title", "history"), [])
+
+    def test_title_matches_rank_first(self):
+        # 'fourier' is the title of 20001 but only the instructor of 10001
+        self.assertEqual(self.codes("any", "fourier"), [20001, 10001])
+
+    def test_value_cannot_inject_query_syntax(self):
+        self.assertEqual(self.codes("title", '") OR * NEAR('), [])
+        self.assertEqual(self.codes("crn", "1 OR 1=1"), [])
+
+    def test_search_courses_whitelist(self):
+        self.assertEqual(self.codes("title", "calculus"), [10001])
+        with self.assertRaises(ValueError):
+            app.search_courses("TITLE LIKE '%' OR 1=1 --", "x")
+
+    def test_triggers_keep_index_in_sync(self):
+        with self.pool.connection() as database:
+            database.execute("UPDATE COURSE SET TITLE = 'Harmonic Analysis' WHERE CRN = 20001")
+            database.execute("UPDATE INSTRUCTOR SET SURNAME = 'Dirichlet' WHERE ID = 1")
+        self.assertEqual(self.codes("title", "harmonic"), [20001])
+        self.assertEqual(self.codes("title", "fourier"), [])
+        self.assertEqual(self.codes("instructor", "dirichlet"), [10001, 20001])
+        self.admin.remove_course(20001)
+        self.assertEqual(self.codes("instructor", "dirichlet"), [10001])
+
+class TestCourseCatalog(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = app.Admin("admin", "password")
+        self.student = app.Student("student0", "password")
+
+    def test_repeated_listing_skips_database(self):
+        self.assertEqual(self.student.register_for_classes(), ["10001: Engineering Calculus, Math, 8:00-9:00, MWF, Fall, 2024, 4 credits"])
+        statements = []
+        with self.pool.connection() as database:
+            database.set_trace_callback(statements.append)
+            try:
+                self.student.register_for_classes()
+                self.admin.view_all_courses()
+            finally:
+                database.set_trace_callback(None)
+        self.assertEqual(statements, [])
+
+    def test_admin_changes_write_through(self):
+        self.admin.view_all_courses()
+        version = app.catalog.version
+        self.admin.add_course(10000, "Statics", "fourierj", "TR 8:00-9:15", "BSME", "Fall", 2024, 3)
+        self.admin.remove_course(10001)
+        self.assertEqual(app.catalog.version, version + 2)
+        listing = self.student.register_for_classes()
+        self.assertEqual(listing, ["10000: Statics, BSME, 8:00-9:15, TR, Fall, 2024, 3 credits"])
+
+        # The incrementally maintained listing matches a fresh load
+        app.catalog.invalidate()
+        self.assertEqual(self.student.register_for_classes(), listing)
+
+    def test_other_database_reloads(self):
+        self.admin.view_all_courses()
+        with self.pool.connection() as database:
+            database.execute("DELETE FROM COURSE")
+        app.pool = ConnectionPool(self.path, size=1)
+        try:
+            self.assertEqual(self.admin.view_all_courses(), [])
+        finally:
+            app.pool.close()
+            app.pool = self.pool
+
+class TestPagination(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = app.Admin("admin", "password")
+        with self.pool.connection() as database:
+            database.executemany("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS) VALUES (?, 'Seminar', 'Math', '8:00-9:00', 'F', 'Fall', 2024, 1)",
+                                 [(crn,) for crn in range(20000, 20024)])
+            database.executemany("INSERT INTO REGISTRATION (student_id, course_code) VALUES (?, 10001)", [(100 + i,) for i in range(20)])
+        app.catalog.invalidate()
+
+    def test_catalog_pages(self):
+        first, after = self.admin.course_page(page_size=10)
+        self.assertEqual(len(first), 10)
+        self.assertTrue(first[0].startswith("10001:"))
+        self.assertEqual(after, 20008)
+        second, _ = self.admin.course_page(after, page_size=10)
+        self.assertTrue(second[0].startswith("20009:"))
+
+        pages = list(app.Student("student0", "password").course_pages(page_size=10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([line for page in pages for line in page], self.admin.view_all_courses())
+
+    def test_roster_pages(self):
+        pages = self.admin.roster_pages(10001, page_size=7)
+        self.assertEqual(len(next(pages)), 7)
+        rest = list(pages)
+        self.assertEqual([len(page) for page in rest], [7, 6])
+        self.assertEqual(self.admin.roster_page(10001, after=119), ([], None))
+        self.assertEqual(list(self.admin.roster_pages(20000)), [])
+
+class TestListings(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.pool.connection() as database:
+            campus = generate_campus(students=0, instructors=10, departments=4, sections=150, seed=3)
+            database.executemany("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS, instructor_id, CAPACITY) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [(record[0] + 10000,) + record[1:] for record in campus["courses"]])
+            database.executemany("INSERT INTO REGISTRATION (student_id, course_code) VALUES (?, 10001)", [(100 + i,) for i in range(20)])
+            database.commit()
+        self.admin = app.Admin("admin", "password")
+
+    def expected(self, listing):
+        order = "DESC" if listing.descending else "ASC"
+        sort = listing.COLUMNS[listing.sort]
+        with self.pool.connection() as database:
+            return database.execute(f"SELECT {', '.join(listing.COLUMNS.values())} FROM {listing._source} WHERE {listing._where} ORDER BY {sort} {order}, {listing.KEY} {order}",
+                                    listing._parameters).fetchall()
+
+    def test_pages_match_the_sorted_query(self):
+        for sort in CourseListing.COLUMNS:
+            for descending in (False, True):
+                listing = self.admin.course_listing(sort, descending)
+                listing.page_size = 7
+                expected = self.expected(listing)
+                self.assertEqual(listing.count(), len(expected))
+                self.assertEqual(listing.rows(0, len(expected) + 5), expected, sort)
+
+                # A fresh listing jumping straight into the middle agrees too
+                jumped = self.admin.course_listing(sort, descending)
+                jumped.page_size = 7
+                self.assertEqual(jumped.rows(60, 12), expected[60:72], sort)
+
+    def test_cached_rows_never_query(self):
+        listing = self.admin.course_listing("title")
+        listing.page_size = 10
+        self.assertIsNone(listing.cached_rows(5, 10))
+        rows = listing.rows(5, 10)
+        self.assertEqual(listing.cached_rows(5, 10), rows)
+        self.assertIsNone(listing.cached_rows(15, 10))
+        with self.assertRaises(ValueError):
+            self.admin.course_listing("TITLE; DROP TABLE COURSE")
+
+    def test_filters_run_in_sql(self):
+        listing = self.admin.course_listing("crn", text="calculus")
+        self.assertEqual(listing.rows(0, 1000), self.expected(listing))
+        self.assertTrue(all("Calculus" in row[1] for row in listing.rows(0, 1000)))
+        self.assertEqual(listing.count(), len(app.search_courses("title", "calculus", limit=1000)))
+
+        roster = self.admin.roster_listing(10001, "surname", True, text="Student")
+        self.assertEqual(roster.count(), 20)
+        self.assertEqual([row[2] for row in roster.rows(0, 3)], ["9", "8", "7"])
+        self.assertEqual(self.admin.roster_listing(10001, text="%").count(), 0)
+
+    def test_indexed_sorts_avoid_sorting(self):
+        for sort in ("crn", "title", "department"):
+            listing = self.admin.course_listing(sort)
+            order = f"ORDER BY {listing.COLUMNS[sort]}, {listing.KEY}"
+            with self.pool.connection() as database:
+                plan = [row[3] for row in database.execute(f"EXPLAIN QUERY PLAN SELECT c.CRN FROM {listing._source} WHERE 1 {order} LIMIT 10")]
+            self.assertFalse([step for step in plan if "TEMP B-TREE" in step], f"{sort}: {plan}")
+
+class TestStreaming(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.pool.connection() as database:
+            database.executemany("INSERT INTO REGISTRATION (student_id, course_code) VALUES (?, 10001)", [(100 + i,) for i in range(20)])
+        self.original_fetch_size = app.FETCH_SIZE
+        app.FETCH_SIZE = 3
+        self.admin = app.Admin("admin", "password")
+        self.instructor = app.Instructor("fourierj", "password")
+
+    def tearDown(self):
+        app.FETCH_SIZE = self.original_fetch_size
+        super().tearDown()
+
+    def test_iterators_match_lists(self):
+        self.assertEqual(sorted(self.admin.iter_roster(10001)), sorted(self.admin.view_roster(10001)))
+        self.assertEqual(len(self.admin.view_roster(10001)), 20)
+        student = app.Student("student0", "password")
+        self.assertEqual([course.course_code for course in student.iter_schedule()], [10001])
+        self.assertEqual([course.course_code for course in student.see_schedule()], [10001])
+
+    def test_instructor_schedule_and_students(self):
+        self.assertEqual(list(self.instructor.view_schedule()), ["Engineering Calculus"])
+        pairs = list(self.instructor.iter_registered_students())
+        self.assertEqual(len(pairs), 20)
+        self.assertEqual({course_name for course_name, _ in pairs}, {"Engineering Calculus"})
+        self.assertEqual(len(self.instructor.view_registered_students()["Engineering Calculus"]), 20)
+
+    def test_records_are_compact(self):
+        entries = list(self.admin.iter_roster_entries(10001))
+        self.assertEqual(entries[0], app.RosterEntry(100, "Student", "0"))
+        self.assertEqual(entries[0].full_name, "Student 0")
+        course = next(app.Student("student0", "password").iter_schedule())
+        self.assertEqual(course, app.Course(10001, "Engineering Calculus", "Joseph", "8:00-9:00"))
+        for record in (course, entries[0], self.admin, self.instructor, app.Student("student0", "password")):
+            self.assertFalse(hasattr(record, "__dict__"), type(record).__name__)
+
+    def test_closing_early_releases_connection(self):
+        roster = self.admin.iter_roster(10001)
+        next(roster)
+        idle = self.pool._idle.qsize()
+        roster.close()
+        self.assertEqual(self.pool._idle.qsize(), idle + 1)
+
+    def test_stream_keeps_its_own_connection(self):
+        roster = self.admin.iter_roster(10001)
+        next(roster)
+        self.assertIsNone(getattr(self.pool._local, "connection", None))
+        with self.pool.connection() as database:
+            self.assertFalse(database.in_transaction)
+            database.execute("UPDATE COURSE SET CAPACITY = 40 WHERE CRN = 10001")
+        finisher = threading.Thread(target=lambda: self.assertEqual(len(list(roster)), 19))
+        finisher.start()
+        finisher.join()
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("SELECT CAPACITY FROM COURSE WHERE CRN = 10001").fetchone(), (40,))
+        self.assertEqual(self.pool._idle.qsize(), self.pool._created)
+
+class TestBatchRosters(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = app.Admin("admin", "password")
+        self.instructor = app.Instructor("fourierj", "password")
+        for crn in range(20001, 20011):
+            self.admin.add_course(crn, f"Section {crn}", "fourierj", "F 8:00-8:50", "Math", "Fall", 2024, 1)
+        with self.pool.connection() as database:
+            database.executemany("INSERT INTO REGISTRATION (student_id, course_code) VALUES (?, ?)",
+                                 [(100 + i, 20001 + i % 10) for i in range(20)])
+
+    def count_queries(self, call):
+        result, queries = self.trace_selects(call)
+        return result, len(queries)
+
+    def test_instructor_rosters_in_one_query(self):
+        self.instructor.view_schedule()
+        students, queries = self.count_queries(self.instructor.view_registered_students)
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(students), 11)
+        self.assertEqual(students["Engineering Calculus"], [])
+        self.assertEqual(sorted(students["Section 20001"]), ["Student 0", "Student 10"])
+
+    def test_instructor_id_resolved_once(self):
+        _, queries = self.count_queries(self.instructor.view_schedule)
+        self.assertEqual(queries, 2)
+        courses, queries = self.count_queries(self.instructor.view_schedule)
+        self.assertEqual(queries, 1)
+        self.assertEqual(self.instructor.instructor_id, 1)
+        self.assertEqual([course.course_code for course in courses.values()], [10001] + list(range(20001, 20011)))
+        self.assertEqual(app.Instructor("nobody", "password").view_schedule(), {})
+
+    def test_batch_rosters(self):
+        rosters, queries = self.count_queries(lambda: self.admin.view_rosters([20001, 20002, 99999]))
+        self.assertEqual(queries, 1)
+        self.assertEqual(sorted(rosters), [20001, 20002, 99999])
+        self.assertEqual(sorted(rosters[20002]), ["Student 1", "Student 11"])
+        self.assertEqual(rosters[99999], [])
+        self.assertEqual(app.load_rosters([]), {})
+
+class TestUserIds(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = app.Admin("admin", "password")
+        self.statements = []
+
+    def trace(self, call):
+        with self.pool.connection() as database:
+            database.set_trace_callback(self.statements.append)
+            try:
+                return call()
+            finally:
+                database.set_trace_callback(None)
+
+    def user_lookups(self):
+        return [statement for statement in self.statements if "FROM USER" in statement]
+
+    def test_authenticate_keeps_user_id(self):
+        student = app.Student("student3", "password")
+        self.assertTrue(student.authenticate())
+        self.assertEqual(student.user_id, 103)
+        self.assertEqual(self.trace(lambda: student.add_course_to_schedule(10001)), "Course added to schedule and database updated.")
+        self.trace(student.see_schedule)
+        self.trace(lambda: student.edit_schedule("drop", 10001))
+        self.assertEqual(self.user_lookups(), [])
+        self.assertFalse(app.Student("student3", "wrong").authenticate())
+
+    def test_admin_resolves_each_username_once(self):
+        self.trace(lambda: self.admin.add_student_to_course("student4", 10001))
+        self.trace(lambda: self.admin.remove_student_from_course("student4", 10001))
+        self.trace(lambda: self.admin.add_student_to_course("student4", 10001))
+        self.assertEqual(len(self.user_lookups()), 1)
+        self.assertEqual(self.admin.add_student_to_course("nobody", 10001), "Student does not exist or is already in this course.")
+
+    def test_removed_user_is_forgotten(self):
+        self.admin.add_student_to_course("student5", 10001)
+        self.admin.remove_user("student5")
+        with self.pool.connection() as database:
+            database.execute("INSERT INTO USER (ID, username, password, role) VALUES (500, 'student5', 'x', 'student')")
+            database.commit()
+        self.admin.add_student_to_course("student5", 10001)
+        with self.pool.connection() as database:
+            self.assertEqual(database.execute("SELECT student_id FROM REGISTRATION WHERE course_code = 10001").fetchall(), [(500,)])
+
+    def test_least_recently_used_are_evicted(self):
+        directory = UserDirectory(size=2)
+        for username in ("student0", "student1", "student0", "student2"):
+            directory.resolve(self.pool, username)
+        self.assertEqual(len(directory), 2)
+        self.assertEqual(directory.resolve(self.pool, "nobody"), None)
+        self.assertEqual(list(directory._ids), ["student0", "student2"])
+
+class TestPasswords(DatabaseTestCase):
+
+    def stored_hash(self, username):
+        with self.pool.connection() as database:
+            return database.execute("SELECT password FROM USER WHERE username = ?", (username,)).fetchone()[0]
+
+    def test_hash_is_salted_and_self_describing(self):
+        first, second = app.hasher.hash("password"), app.hasher.hash("password")
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith("scrypt$n=1024,r=8,p=1$"))
+        self.assertTrue(app.hasher.verify("password", first))
+        self.assertFalse(app.hasher.verify("wrong", first))
+        self.assertFalse(app.hasher.verify("password", "scrypt$garbage"))
+        pbkdf2 = PasswordHasher("pbkdf2_sha256", iterations=1000)
+        self.assertTrue(pbkdf2.hash("password").startswith("pbkdf2_sha256$i=1000$"))
+        # Either scheme verifies hashes made by the other
+        self.assertTrue(pbkdf2.verify("password", first))
+        self.assertTrue(app.hasher.verify("password", pbkdf2.hash("password")))
+
+    def test_legacy_hash_is_upgraded_at_login(self):
+        self.assertEqual(self.stored_hash("student1"), legacy_hash("password"))
+        self.assertFalse(app.Student("student1", "wrong").authenticate())
+        self.assertEqual(self.stored_hash("student1"), legacy_hash("password"))
+        self.assertTrue(app.Student("student1", "password").authenticate())
+        upgraded = self.stored_hash("student1")
+        self.assertTrue(upgraded.startswith("scrypt$"))
+        self.assertFalse(app.hasher.needs_rehash(upgraded))
+        self.assertTrue(app.Student("student1", "password").authenticate())
+        self.assertEqual(self.stored_hash("student1"), upgraded)
+        self.assertFalse(app.Student("student1", "wrong").authenticate())
+        self.assertFalse(app.Student("nobody", "password").authenticate())
+
+    def test_password_is_cleared_when_login_fails(self):
+        for user in (app.Student("student1", "wrong"), app.Student("nobody", "password"), app.Admin("student1", "password")):
+            self.assertFalse(user.authenticate())
+            self.assertIsNone(user.password)
+        student = app.Student("student1", "password")
+        hasher, app.hasher = app.hasher, None
+        try:
+            with self.assertRaises(AttributeError):
+                student.authenticate()
+        finally:
+            app.hasher = hasher
+        self.assertIsNone(student.password)
+
+    def test_new_settings_rehash_at_login(self):
+        app.Admin("admin", "password").add_user(600, "newuser", "secret", "student", "New", "User")
+        self.assertTrue(self.stored_hash("newuser").startswith("scrypt$n=1024,"))
+        app.hasher = PasswordHasher(n=2 ** 11)
+        self.assertTrue(app.hasher.needs_rehash(self.stored_hash("newuser")))
+        self.assertTrue(app.Student("newuser", "secret").authenticate())
+        self.assertTrue(self.stored_hash("newuser").startswith("scrypt$n=2048,"))
+
+    def test_verified_passwords_are_cached(self):
+        hasher = PasswordHasher(n=2 ** 10, cache_size=2)
+        hashes = [hasher.hash(f"password{i}") for i in range(3)]
+        for i, encoded in enumerate(hashes):
+            self.assertTrue(hasher.verify(f"password{i}", encoded))
+            self.assertFalse(hasher.verify("wrong", encoded))
+        self.assertEqual(len(hasher._cache), 2)
+        self.assertNotIn(b"password", b"".join(hasher._cache))
+
+    def test_calibrate_stays_within_target(self):
+        hasher, trials = calibrate(target=0.02, samples=1)
+        self.assertTrue(trials)
+        within = [seconds for parameters, seconds in trials if parameters == hasher.parameters()]
+        self.assertTrue(within[0] <= 0.02 or hasher.n == 2 ** 10)
+
+# Clock for session tests that only moves when told to
+class ManualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSessions(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.clock = ManualClock()
+        self.original_sessions = app.sessions
+        app.sessions = SessionStore(ttl=60, clock=self.clock)
+        self.statements = []
+
+    def tearDown(self):
+        app.sessions = self.original_sessions
+        super().tearDown()
+
+    def traced(self, call):
+        with self.pool.connection() as database:
+            database.set_trace_callback(self.statements.append)
+            try:
+                return call()
+            finally:
+                database.set_trace_callback(None)
+
+    def test_login_starts_a_session(self):
+        instructor = app.Instructor("fourierj", "password")
+        self.assertTrue(instructor.authenticate())
+        self.assertIsNone(instructor.password)
+        session = app.sessions.get(instructor.token)
+        self.assertEqual((session.user_id, session.username, session.role), (2, "fourierj", "instructor"))
+        self.assertEqual(session.profile, {"id": 1, "name": "Joseph", "surname": "Fourier"})
+
+    def test_live_session_skips_password_and_user_lookup(self):
+        student = app.Student("student2", "password")
+        self.assertTrue(student.authenticate())
+        hasher, app.hasher = app.hasher, None  # Any password check would fail now
+        try:
+            self.assertTrue(self.traced(student.authenticate))
+            resumed = self.traced(lambda: app.resume_session(student.token))
+        finally:
+            app.hasher = hasher
+        self.assertIsInstance(resumed, app.Student)
+        self.assertEqual((resumed.username, resumed.user_id), ("student2", 102))
+        self.assertEqual(self.statements, [])
+        self.assertEqual(resumed.add_course_to_schedule(10001), "Course added to schedule and database updated.")
+
+    def test_sessions_expire_after_ttl_since_last_use(self):
+        admin = app.Admin("admin", "password")
+        self.assertTrue(admin.authenticate())
+        self.clock.now = 50
+        self.assertTrue(admin.authenticate())
+        self.clock.now = 100
+        self.assertIsNotNone(app.resume_session(admin.token))
+        self.clock.now = 161
+        self.assertIsNone(app.resume_session(admin.token))
+        self.assertFalse(admin.authenticate())
+        self.assertEqual(len(app.sessions), 0)
+
+    def test_forged_and_revoked_tokens_are_rejected(self):
+        student = app.Student("student3", "password")
+        self.assertTrue(student.authenticate())
+        session_id, _, signature = student.token.partition(".")
+        self.assertIsNone(app.resume_session(f"{session_id}.{signature[::-1]}"))
+        self.assertIsNone(app.resume_session(session_id))
+        self.assertIsNone(SessionStore().get(student.token))
+        for malformed in ("abc.\u00e9", f"{session_id}.\u00e9{signature[1:]}", "\u00e9.\u00e9", "a.\ud800", ".", b"abc.def"):
+            self.assertIsNone(app.sessions.get(malformed))
+        self.assertIsNone(app.resume_session("a.\u00e9"))
+        app.sessions.revoke("abc.\u00e9")
+        token = student.token
+        student.logout()
+        self.assertIsNone(app.resume_session(token))
+        other = app.Student("student4", "password")
+        other.authenticate()
+        app.Admin("admin", "password").remove_user("student4")
+        self.assertIsNone(app.resume_session(other.token))
+
+    def test_role_must_match_account(self):
+        self.assertFalse(app.Admin("student5", "password").authenticate())
+        self.assertFalse(app.Student("admin", "password").authenticate())
+        self.assertEqual(len(app.sessions), 0)
+        token = app.sessions.create(300, "visitor", "guest")
+        self.assertIsNone(app.resume_session(token))
+
+    def test_least_recently_used_and_expired_are_evicted(self):
+        store = SessionStore(ttl=10, size=2, clock=self.clock)
+        first, second = store.create(1, "a", "student"), store.create(2, "b", "student")
+        store.get(first)
+        third = store.create(3, "c", "student")
+        self.assertIsNone(store.get(second))
+        self.assertEqual(len(store), 2)
+        self.clock.now = 5
+        store.get(third)
+        self.clock.now = 12
+        store.create(4, "d", "student")
+        self.assertIsNone(store.get(first))
+        self.assertIsNotNone(store.get(third))
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.database = sql.connect(":memory:")
+
+    def tearDown(self):
+        self.database.close()
+
+    def test_migrate_is_idempotent(self):
+        latest = MIGRATIONS[-1][0]
+        self.assertEqual(migrate(self.database), [version for version, _, _ in MIGRATIONS])
+        self.assertEqual(migrate(self.database), [])
+        self.assertEqual(current_version(self.database), latest)
+
+    def test_migrate_to_target(self):
+        self.assertEqual(migrate(self.database, target=1), [1])
+        self.assertEqual(current_version(self.database), 1)
+        indexes = self.database.execute("SELECT name FROM sqlite_master WHERE name = 'idx_registration_course'").fetchall()
+        self.assertEqual(indexes, [])
+
+    def test_existing_database_keeps_data(self):
+        # A database built by the old initialize_database has the tables but no schema_version
+        for statement in BASE_TABLES:
+            self.database.execute(statement.replace(" IF NOT EXISTS", ""))
+        self.database.execute("INSERT INTO USER (username, password, role) VALUES ('newtoni', 'x', 'student')")
+        self.database.execute("INSERT INTO COURSE (CRN, TITLE, DEPARTMENT, TIME, DAYS, SEMESTER, YEAR, CREDITS) VALUES (1, 'Jazz', 'Humanities', '4:00-5:00', 'TR', 'Fall', 2024, 3)")
+        self.database.execute("INSERT INTO REGISTRATION (student_id, course_code) VALUES (1, 1)")
+        self.database.commit()
+
+        migrate(self.database)
+        self.assertEqual(self.database.execute("SELECT username FROM USER").fetchall(), [("newtoni",)])
+        self.assertEqual(self.database.execute("SELECT ENROLLED, CAPACITY FROM COURSE").fetchall(), [(1, 30)])
+        blob, = self.database.execute("SELECT MEETING_MASK FROM COURSE").fetchone()
+        self.assertEqual(decode_mask(blob), meeting_mask("TR", "4:00-5:00"))
+        self.assertEqual(self.database.execute("SELECT rowid FROM COURSE_SEARCH WHERE COURSE_SEARCH MATCH 'jazz'").fetchall(), [(1,)])
+        self.assertEqual(current_version(self.database), MIGRATIONS[-1][0])
+
+    def test_failed_step_rolls_back(self):
+        def broken(database):
+            database.execute("CREATE TABLE half_done (ID INTEGER)")
+            raise sql.OperationalError("boom")
+
+        MIGRATIONS.append((MIGRATIONS[-1][0] + 1, "Broken step", [broken]))
+        try:
+            with self.assertRaises(sql.OperationalError):
+                migrate(self.database)
+        finally:
+            MIGRATIONS.pop()
+        self.assertEqual(current_version(self.database), MIGRATIONS[-1][0])
+        tables = self.database.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchall()
+        self.assertEqual(tables, [])
+
+    def test_open_transaction_is_not_committed(self):
+        migrate(self.database)
+        self.database.execute("INSERT INTO USER (username, password, role) VALUES ('pending', 'x', 'student')")
+        with self.assertRaises(sql.ProgrammingError):
+            migrate(self.database)
+        self.database.rollback()
+        self.assertEqual(self.database.execute("SELECT COUNT(*) FROM USER").fetchone(), (0,))
+
+class TestBulkLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.database = sql.connect(":memory:")
+        migrate(self.database)
+
+    def tearDown(self):
+        self.database.close()
+
+    def index_names(self):
+        return {row[0] for row in self.database.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+
+    def test_bulk_load_all_record_types(self):
+        indexes = self.index_names()
+        users = [(i, f"user{i}", "hash", "student") for i in range(1, 5001)]
+        students = [(i, "Student", str(i), f"user{i}", "2026", "BSCO", f"user{i}") for i in range(1, 5001)]
+        courses = [(crn, f"Course {crn}", "BSCO", "8:00-8:50", "MWF", "Fall", 2024, 3, 1, 30) for crn in range(100, 600)]
+        registrations = [(i, 100 + i % 500) for i in range(1, 5001)]
+
+        counts = bulk_load(self.database, users=users, students=students,
+                           instructors=[(1, "Joseph", "Fourier", "Full Prof.", 1820, "BSEE", "fourierj")],
+                           admins=[(1, "Vera", "Rubin", "Vice-President", "Wentworth 101", "rubinv")],
+                           courses=courses, registrations=registrations)
+
+        self.assertEqual(counts, {"users": 5000, "students": 5000, "instructors": 1, "admins": 1, "courses": 500, "registrations": 5000})
+        self.assertEqual(self.index_names(), indexes)
+        roster = self.database.execute("SELECT COUNT(*) FROM REGISTRATION WHERE course_code = 100").fetchone()[0]
+        self.assertEqual(roster, 10)
+        blob, = self.database.execute("SELECT MEETING_MASK FROM COURSE WHERE CRN = 100").fetchone()
+        self.assertEqual(decode_mask(blob), meeting_mask("MWF", "8:00-8:50"))
+        self.assertEqual(self.database.execute("SELECT COUNT(*) FROM COURSE_SEARCH WHERE COURSE_SEARCH MATCH 'course'").fetchone()[0], 500)
+        triggers = self.database.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'course_search%'").fetchone()[0]
+        self.assertEqual(triggers, 6)
+        self.assertEqual(self.database.execute("SELECT ENROLLED FROM COURSE WHERE CRN = 100").fetchone()[0], 10)
+
+    def test_bulk_load_is_all_or_nothing(self):
+        users = [(None, "same", "hash", "student"), (None, "same", "hash", "student")]
+        with self.assertRaises(sql.IntegrityError):
+            bulk_load(self.database, users=users, courses=[(1, "Course", "BSCO", "8:00-8:50", "M", "Fall", 2024, 3, None, 30)])
+        self.assertEqual(self.database.execute("SELECT COUNT(*) FROM USER").fetchone()[0], 0)
+        self.assertEqual(self.database.execute("SELECT COUNT(*) FROM COURSE").fetchone()[0], 0)
+        self.assertIn("idx_registration_course", self.index_names())
+
+    def test_open_transaction_is_not_committed(self):
+        self.database.execute("INSERT INTO USER (username, password, role) VALUES ('pending', 'x', 'student')")
+        with self.assertRaises(sql.ProgrammingError):
+            bulk_load(self.database, users=[(None, "loaded", "hash", "student")])
+        self.database.rollback()
+        self.assertEqual(self.database.execute("SELECT COUNT(*) FROM USER").fetchone()[0], 0)
+
+class TestCampusGenerator(unittest.TestCase):
+
+    def test_generator_is_deterministic(self):
+        self.assertEqual(generate_campus(students=200, sections=30, seed=7), generate_campus(students=200, sections=30, seed=7))
+        self.assertNotEqual(generate_campus(students=200, sections=30, seed=7), generate_campus(students=200, sections=30, seed=8))
+
+    def test_meeting_time_format(self):
+        self.assertEqual(meeting_time("8:00", 50), "8:00-8:50")
+        self.assertEqual(meeting_time("12:00", 110), "12:00-1:50")
+        self.assertEqual(meeting_time("12:30", 75), "12:30-1:45")
+
+    def test_populated_database_matches_parameters(self):
+        database = sql.connect(":memory:")
+        counts = populate_database(database, students=300, instructors=12, departments=4, sections=40, registrations_per_student=3)
+        self.assertEqual((counts["students"], counts["instructors"], counts["courses"]), (300, 12, 40))
+        self.assertAlmostEqual(counts["registrations"] / 300, 3, delta=0.5)
+        self.assertEqual(database.execute("SELECT COUNT(DISTINCT DEPARTMENT) FROM COURSE").fetchone()[0], 4)
+        self.assertEqual(database.execute("SELECT COUNT(*) FROM COURSE WHERE ENROLLED > CAPACITY").fetchone()[0], 0)
+        # Every registration resolves to a student name through the roster join
+        joined = database.execute("SELECT COUNT(*) FROM STUDENT s JOIN REGISTRATION r ON s.ID = r.student_id").fetchone()[0]
+        self.assertEqual(joined, counts["registrations"])
+        # No student is registered for two sections that meet at the same time
+        schedules = {}
+        for student_id, blob in database.execute("SELECT r.student_id, c.MEETING_MASK FROM REGISTRATION r JOIN COURSE c ON c.CRN = r.course_code"):
+            self.assertFalse(schedules.get(student_id, 0) & decode_mask(blob))
+            schedules[student_id] = schedules.get(student_id, 0) | decode_mask(blob)
+        database.close()
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 95), 95)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_benchmark_covers_every_method(self):
+        original_pool = app.pool
+        results = benchmark_methods([(60, 12)], iterations=5)
+        self.assertIs(app.pool, original_pool)
+        self.assertEqual({result["method"] for result in results},
+                         {"authenticate", "register_for_classes", "add_course_to_schedule", "see_schedule", "view_registered_students",
+                          "view_all_courses", "view_roster", "add_user", "search_courses"})
+        for result in results:
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreater(result["ops_per_second"], 0)
+
+    def test_group_commit_benchmark(self):
+        original_pool = app.pool
+        results = benchmark_group_commit(writers=2, duration=0.2, students=50, sections=10)
+        self.assertIs(app.pool, original_pool)
+        self.assertIsNone(app.writer)
+        self.assertEqual([result["mode"] for result in results], ["commit per write", "group commit"])
+        self.assertEqual(results[0]["writes_per_commit"], 1.0)
+        self.assertGreaterEqual(results[1]["writes_per_commit"], 1.0)
+
+    def test_password_benchmark(self):
+        results = benchmark_password_hashing(target=0.005, logins=4, samples=1)
+        self.assertEqual([result["scheme"] for result in results], ["scrypt", "pbkdf2_sha256"])
+        for result in results:
+            self.assertTrue(result["trials"])
+            self.assertGreater(result["logins_per_second"], 0)
+
+class TestQueryPlans(DatabaseTestCase):
+
+    # Run the application calls with the pool traced and return every SELECT they issued
+    def capture_queries(self, *calls):
+        return self.trace_selects(lambda: [call() for call in calls])[1]
+
+    # Fail if any step of the query plan reads a whole table or index. Walking
+    # json_each only reads the list of values passed in, so it does not count.
+    def assertNoFullScan(self, query):
+        with self.pool.connection() as database:
+            plan = [row[3] for row in database.execute("EXPLAIN QUERY PLAN " + query)]
+        scans = [step for step in plan if step.startswith("SCAN") and not step.startswith("SCAN json_each")]
+        self.assertEqual(scans, [], f"Full scan in plan for: {query}\n{plan}")
+
+    def test_hot_queries_use_indexes(self):
+        student = app.Student("student0", "password")
+        instructor = app.Instructor("fourierj", "password")
+        admin = app.Admin("admin", "password")
+        student.add_course_to_schedule(10001)
+        instructor.assign_course(app.Course(10001, "Engineering Calculus", "fourierj", "8:00-9:00"))
+
+        queries = self.capture_queries(
+            student.see_schedule,
+            instructor.view_schedule,
+            instructor.view_registered_students,
+            lambda: admin.view_roster(10001),
+            lambda: admin.roster_page(10001, after=100),
+        )
+        queries.append("SELECT ID, student_id FROM WAITLIST WHERE course_code = 10001 ORDER BY ID LIMIT 1")
+        self.assertGreaterEqual(len(queries), 4)
+        for query in queries:
+            self.assertNoFullScan(query)
+
+if __name__ == '__main__':
+    unittest.main()